@@ -0,0 +1,79 @@
+import wave
+import threading
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+MODEL_SAMPLE_RATE = 16000
+
+def select_capture_rate(preferred=MODEL_SAMPLE_RATE, device=None):
+    # Capture at the model rate when the device allows it so no resampling is needed.
+    try:
+        import sounddevice as sd
+        sd.check_input_settings(device=device, channels=1, dtype="float32", samplerate=preferred)
+        return int(preferred)
+    except Exception:
+        try:
+            import sounddevice as sd
+            return int(sd.query_devices(device, kind="input")["default_samplerate"])
+        except Exception:
+            return int(preferred)  # no input device (e.g. headless runs); nothing to capture anyway
+
+def to_mono(audio):
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return audio
+
+@lru_cache(maxsize=8)
+def _polyphase_filter(up, down):
+    # Same anti-aliasing FIR resample_poly designs by default, built once per rate pair.
+    from scipy.signal import firwin
+    max_rate = max(up, down)
+    return firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0)).astype(np.float32)
+
+def resample(audio, orig_sr, target_sr=MODEL_SAMPLE_RATE):
+    audio = to_mono(audio)
+    if orig_sr == target_sr:
+        return audio
+    # scipy.signal takes most of a second to import; only pay for it when rates differ.
+    from scipy.signal import resample_poly
+    g = gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // g, int(orig_sr) // g
+    return resample_poly(audio, up, down, window=_polyphase_filter(up, down)).astype(np.float32, copy=False)
+
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+def read_wav(path):
+    with wave.open(path, "rb") as wf:
+        width, channels, rate = wf.getsampwidth(), wf.getnchannels(), wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+    if width not in _PCM_DTYPES:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+    pcm = np.frombuffer(raw, dtype=_PCM_DTYPES[width]).reshape(-1, channels)
+    if width == 1:
+        audio = (pcm.astype(np.float32) - 128) / 128
+    else:
+        audio = pcm.astype(np.float32) / float(2 ** (8 * width - 1))
+    return to_mono(audio), rate
+
+def write_wav(path, audio, samplerate):
+    pcm = (np.clip(to_mono(audio), -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(samplerate)
+        wf.writeframes(pcm.tobytes())
+
+def write_wav_async(path, audio, samplerate, on_done=None):
+    # Keeps disk I/O off the inference path; audio must not be mutated afterwards.
+    def _write():
+        try:
+            write_wav(path, audio, samplerate)
+            if on_done: on_done(path, None)
+        except Exception as e:
+            if on_done: on_done(path, e)
+    t = threading.Thread(target=_write, daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+import audio_utils
+import model_registry
+import vad
+
+# Headless counterpart of the GUI: every file goes through the same process_audio path
+# (resample, VAD, speaker check, transcription, command matching) as a live utterance.
+# Each pool worker builds one assistant and keeps its models resident, and files are
+# handed out in chunks, so model loads are paid once per worker rather than per file.
+# With the speaker check on, the speaker embeddings for a whole chunk come from a single
+# padded encode_batch call before its files are processed one by one.
+
+_assistant = None
+_embeddings = {}
+
+def collect_inputs(paths, history_dir=None):
+    items = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in sorted(os.walk(path)):
+                items.extend(("file", os.path.join(root, n)) for n in sorted(names) if n.lower().endswith(".wav"))
+        else:
+            items.append(("file", path))
+    if history_dir:
+        items.extend(("history", history_dir, e["id"]) for e in _history(history_dir).entries)
+    return items
+
+def _init_worker(execute, verify, config_path):
+    global _assistant
+    import config_manager
+    from benchmark import make_replay_assistant
+    config_manager.CREATE_MISSING = False
+    if config_path:
+        config_manager.CONFIG_FILE = config_path
+    if verify is None:
+        verify = config_manager.load_config().get("speaker_recognition_enabled", False)
+    _assistant = make_replay_assistant(execute=execute, verify=verify)
+    _assistant.scheduler.stop()
+    _assistant.embed_audio = _embedder(_assistant.embed_audio)
+
+def _audio_key(audio):
+    return hashlib.blake2b(np.ascontiguousarray(audio, dtype=np.float32).tobytes(), digest_size=16).digest()
+
+def _embedder(embed):
+    # process_audio asks for the embedding of the clip it just trimmed; hand back the one
+    # computed for the chunk, or fall back to a single call for anything not precomputed.
+    def embed_audio(audio):
+        emb = _embeddings.pop(_audio_key(audio), None)
+        return emb if emb is not None else embed(audio)
+    return embed_audio
+
+def _speaker_clip(audio, rate):
+    # The clip process_audio will embed: resampled and, with VAD on, trimmed the same way.
+    audio = audio_utils.resample(audio, rate)
+    if _assistant.vad_enabled:
+        trimmed = vad.trim_silence(audio, audio_utils.MODEL_SAMPLE_RATE)
+        return None if trimmed is None else trimmed[0]
+    return audio
+
+def _embed_chunk(loaded):
+    _embeddings.clear()
+    if not _assistant.speaker_check_enabled() or _assistant.worker:
+        return
+    clips = [c for c in (_speaker_clip(*a) for a in loaded if a is not None) if c is not None and len(c)]
+    if len(clips) < 2:
+        return
+    for clip, emb in zip(clips, model_registry.embed_batch(clips, _log)):
+        _embeddings[_audio_key(clip)] = emb
+
+@lru_cache(maxsize=None)
+def _history(directory):
+    from history import RecordingHistory
+    return RecordingHistory(directory)
+
+def _load(item):
+    if item[0] == "history":
+        return _history(item[1]).load(item[2])
+    return audio_utils.read_wav(item[1])
+
+def _log(message):
+    print(message, file=sys.stderr)
+
+def _try_load(item):
+    try:
+        return _load(item)
+    except Exception as e:
+        return e
+
+def process_chunk(items):
+    loaded = [_try_load(item) for item in items]
+    try:
+        _embed_chunk([a if isinstance(a, tuple) else None for a in loaded])
+    except Exception as e:
+        _embeddings.clear()  # per-file embeddings still run, and report their own errors
+        _log(f"Batched speaker embedding failed: {e}")
+    return [process_item(item, audio) for item, audio in zip(items, loaded)]
+
+def process_item(item, loaded=None):
+    from job_queue import Job
+    import metrics
+    source = f"history:{item[2]}" if item[0] == "history" else item[1]
+    if loaded is None:
+        loaded = _try_load(item)
+    if isinstance(loaded, Exception):
+        return {"source": source, "status": "error", "error": str(loaded)}
+    audio, rate = loaded
+    _assistant.launched = []
+    log = []
+    _assistant.log = log.append
+    job = Job(audio, samplerate=rate)
+    try:
+        _assistant.process_audio(job)
+    except Exception as e:
+        job.status = "error"
+        return dict(metrics.utterance_record(job, rate), source=source, error=str(e), log=log)
+    record = metrics.utterance_record(job, rate)
+    record.update({
+        "source": source,
+        "speaker_score": job.speaker_score,
+        "keyword": (job.command or {}).get("keyword"),
+        "actions": _assistant.launched,
+        "executed": bool(_assistant.launched) and _assistant.execute,
+        "log": log,
+    })
+    return record
+
+def run(items, workers=1, chunksize=4, execute=False, verify=None, config_path=None):
+    size = max(1, chunksize)
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    if workers <= 1:
+        _init_worker(execute, verify, config_path)
+        for chunk in chunks:
+            yield from process_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=_init_worker, initargs=(execute, verify, config_path)) as pool:
+        for records in pool.map(process_chunk, chunks):
+            yield from records
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run stored audio through the voice command pipeline without the GUI")
+    parser.add_argument("inputs", nargs="*", help="WAV files or directories (searched recursively)")
+    parser.add_argument("--history", help="Also process every entry of this recording history directory")
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; each loads its own models")
+    parser.add_argument("--chunksize", type=int, default=4, help="Files handed to a worker at a time; their speaker embeddings are computed in one batch")
+    parser.add_argument("--execute", action="store_true", help="Actually launch matched apps/browsers")
+    parser.add_argument("--verify", dest="verify", action="store_true", default=None,
+                        help="Check the speaker (default: as configured)")
+    parser.add_argument("--no-verify", dest="verify", action="store_false")
+    parser.add_argument("--config", help="Config file to take commands and settings from (default: config.json)")
+    args = parser.parse_args(argv)
+
+    items = collect_inputs(args.inputs, args.history)
+    if not items:
+        parser.error("no input files")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    statuses = {}
+    t0 = time.perf_counter()
+    try:
+        for record in run(items, args.workers, args.chunksize, args.execute, args.verify, args.config):
+            statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+            out.write(json.dumps(record, separators=(",", ":")) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    wall = time.perf_counter() - t0
+    print(json.dumps({"files": len(items), "wall_seconds": wall, "statuses": statuses}), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
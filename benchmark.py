@@ -0,0 +1,463 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import audio_utils
+from capture import RingBuffer
+
+def _test_signal(rate, seconds, seed=0):
+    # Noise-modulated tones: cheap stand-in for speech with energy across the band.
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds), dtype=np.float32) / rate
+    tones = sum(np.sin(2 * np.pi * f * t) for f in (180.0, 440.0, 2500.0, 6000.0))
+    return (0.1 * tones * (1 + 0.3 * rng.standard_normal(len(t)))).astype(np.float32)
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+def bench_capture_rate(args):
+    transcribe = None
+    if args.models:
+        import model_registry
+        transcribe = model_registry.get("whisper").transcribe
+    results = []
+    for rate in args.rates:
+        audio = _test_signal(rate, args.seconds)
+        callback_ms, latency_ms, peaks = [], [], []
+        for _ in range(args.repeat):
+            tracemalloc.start()
+            ring = RingBuffer(len(audio))
+            t0 = time.perf_counter()
+            for i in range(0, len(audio), args.blocksize):
+                ring.write(audio[i:i + args.blocksize])
+            t1 = time.perf_counter()
+            clip = audio_utils.resample(ring.read(0), rate)
+            if transcribe:
+                transcribe(clip)
+            t2 = time.perf_counter()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            callback_ms.append((t1 - t0) * 1000)
+            latency_ms.append((t2 - t1) * 1000)
+        results.append({
+            "capture_rate": rate,
+            "resampled": rate != audio_utils.MODEL_SAMPLE_RATE,
+            "clip_seconds": args.seconds,
+            "ring_bytes": int(audio.nbytes),
+            "capture_callbacks_ms_p50": _percentile(callback_ms, 50),
+            "post_release_ms_p50": _percentile(latency_ms, 50),
+            "post_release_ms_p95": _percentile(latency_ms, 95),
+            "peak_traced_bytes": int(max(peaks)),
+            "with_models": bool(transcribe),
+        })
+    return results
+
+def _latency_summary(values):
+    return {
+        "count": len(values),
+        "mean": float(np.mean(values)) if values else 0.0,
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+    }
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+def _words(text):
+    return "".join(c if c.isalnum() or c.isspace() else " " for c in text.lower()).split()
+
+def word_errors(reference, hypothesis):
+    ref, hyp = _words(reference), _words(hypothesis)
+    # Levenshtein distance over words, one DP row at a time.
+    row = np.arange(len(hyp) + 1)
+    for i, r in enumerate(ref, 1):
+        prev, row = row, np.empty_like(row)
+        row[0] = i
+        for j, h in enumerate(hyp, 1):
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (r != h))
+    return int(row[-1]), len(ref)
+
+def load_corpus(directory, labels_path=None):
+    files = sorted(glob.glob(os.path.join(directory, "*.wav")))
+    labels_path = labels_path or os.path.join(directory, "labels.json")
+    labels = {}
+    if os.path.exists(labels_path):
+        with open(labels_path, "r") as f:
+            labels = json.load(f)
+    return files, labels
+
+# Stub models: transcripts come from a "<name>.txt" sidecar next to each WAV, and inference
+# time is simulated as a fraction of the clip length, so the harness runs without
+# Whisper/SpeechBrain while still exercising the real resampling, VAD and matching code.
+class StubModels:
+    def __init__(self, rtf=0.0):
+        self.rtf = rtf
+        self.current_path = None
+
+    def _simulate(self, audio):
+        if self.rtf:
+            time.sleep(len(audio) / audio_utils.MODEL_SAMPLE_RATE * self.rtf)
+
+    def transcribe(self, audio, prompt=None):
+        self._simulate(audio)
+        sidecar = os.path.splitext(self.current_path)[0] + ".txt"
+        if not os.path.exists(sidecar):
+            return ""
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return f.read().strip().lower()
+
+    def embed(self, audio):
+        self._simulate(audio)
+        return np.ones(192, dtype=np.float32)
+
+    def embed_file(self, path):
+        return np.ones(192, dtype=np.float32)
+
+def make_replay_assistant(stub=None, execute=False, verify=False):
+    # Subclass of the real voice thread: process_audio/process_command run unchanged, only
+    # the model calls (when stubbed) and the process launches (unless executing) are swapped.
+    import config_manager
+    from speaker_id import SpeakerIndex
+    from voice_assistant import VoiceAssistantThread
+    config_manager.CREATE_MISSING = False
+
+    class ReplayAssistant(VoiceAssistantThread):
+        def __init__(self):
+            super().__init__()
+            self.save_last_recording = False
+            self.listening_mode = "push_to_talk"
+            self.speaker_enabled = verify and (stub is not None or os.path.exists(self.enroll_path)
+                                               or (self.speaker_mode == "identify" and bool(self.enrollments)))
+            if stub is not None and verify:
+                self.enroll_path = self.enroll_path or os.devnull
+                self.enroll_embedding = np.ones(192, dtype=np.float32)
+            self.launched = []
+            self.execute = execute
+
+        def create_metrics_writer(self, cfg):
+            return None
+
+        def create_history(self, cfg):
+            return None
+
+        # Replays run alongside the GUI and each other (batch workers); they keep computed
+        # enrollment embeddings in memory rather than writing them to the shared config.
+        def cache_enrollment_embedding(self, name, file_hash, emb):
+            pass
+
+        def log(self, message):
+            pass
+
+        def ensure_models(self, names):
+            if stub is None:
+                super().ensure_models(names)
+
+        def transcribe_audio(self, audio, prompt=None, options=None):
+            if stub is None:
+                return super().transcribe_audio(audio, prompt, options)
+            return stub.transcribe(audio, prompt)
+
+        def embed_audio(self, audio):
+            if stub is None:
+                return super().embed_audio(audio)
+            return stub.embed(audio)
+
+        def embed_file(self, path):
+            if stub is None:
+                return super().embed_file(path)
+            return stub.embed_file(path)
+
+        def load_speaker_index(self):
+            if stub is None:
+                return super().load_speaker_index()
+            # Stub vectors for every configured enrollment; the files need not exist.
+            if self._speaker_index is None:
+                self._speaker_index = SpeakerIndex({name: stub.embed_file(path) for name, path in self.enrollments.items()})
+            return self._speaker_index
+
+        def open_app(self, path):
+            self.launched.append(["app", path])
+            if execute: super().open_app(path)
+
+        def open_browser(self, url=None, extra_args=None):
+            self.launched.append(["browser", url] + list(extra_args or []))
+            if execute: super().open_browser(url, extra_args)
+
+    return ReplayAssistant()
+
+def bench_replay(args):
+    from job_queue import Job
+    if args.config:
+        import config_manager
+        config_manager.CONFIG_FILE = args.config
+    stub = StubModels(args.stub_rtf) if args.models == "stub" else None
+    assistant = make_replay_assistant(stub, execute=args.execute, verify=args.verify)
+    assistant.scheduler.stop()
+    files, labels = load_corpus(args.corpus, args.labels)
+    stages, results = {}, []
+    audio_seconds = correct = labelled = 0
+    t_start = time.perf_counter()
+    for path in files:
+        audio, rate = audio_utils.read_wav(path)
+        audio_seconds += len(audio) / rate
+        if stub is not None:
+            stub.current_path = path
+        job = Job(audio, samplerate=rate)
+        assistant.process_audio(job)
+        for stage, ms in job.timings.items():
+            stages.setdefault(stage, []).append(ms)
+        keyword = (job.command or {}).get("keyword", "").lower()
+        entry = {"file": os.path.basename(path), "status": job.status, "transcription": job.transcription,
+                 "keyword": keyword or None, "timings_ms": job.timings}
+        name = os.path.basename(path)
+        if name in labels:
+            labelled += 1
+            entry["expected"] = labels[name]
+            entry["correct"] = keyword == (labels[name] or "").lower()
+            correct += entry["correct"]
+        results.append(entry)
+    wall = time.perf_counter() - t_start
+    report = {
+        "models": args.models,
+        "files": len(files),
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "throughput_utterances_per_s": len(files) / wall if wall else 0.0,
+        "realtime_factor": wall / audio_seconds if audio_seconds else 0.0,
+        "stages_ms": {stage: _latency_summary(v) for stage, v in stages.items()},
+        "accuracy": {"labelled": labelled, "correct": correct,
+                     "rate": correct / labelled if labelled else None},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if args.per_file:
+        report["results"] = results
+    return report
+
+def bench_backends(args):
+    import gc
+    import model_registry
+    if args.cpu_threads:
+        model_registry.configure(cpu_threads=args.cpu_threads)
+    files, _ = load_corpus(args.corpus)
+    corpus = []
+    for path in files:
+        sidecar = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(sidecar):
+            audio, rate = audio_utils.read_wav(path)
+            with open(sidecar, "r", encoding="utf-8") as f:
+                corpus.append((audio_utils.resample(audio, rate), f.read().strip()))
+    results = []
+    for spec in args.backends:
+        backend, _, size = spec.partition(":")
+        entry = {"backend": backend, "model": size or model_registry.settings["whisper_model"]}
+        try:
+            gc.collect()
+            rss_before = current_rss_mb()
+            t0 = time.perf_counter()
+            model = model_registry.create_asr(backend, size or None, args.device)
+            entry["load_seconds"] = time.perf_counter() - t0
+            model.transcribe(np.zeros(audio_utils.MODEL_SAMPLE_RATE, dtype=np.float32))
+            latencies, errors, words = [], 0, 0
+            for audio, reference in corpus:
+                t0 = time.perf_counter()
+                hypothesis = model.transcribe(audio).get("text", "")
+                latencies.append((time.perf_counter() - t0) * 1000)
+                e, n = word_errors(reference, hypothesis)
+                errors += e
+                words += n
+            rss_after = current_rss_mb()
+            entry.update({
+                "device": getattr(model, "device", model_registry.select_device(args.device)),
+                "files": len(corpus),
+                "latency_ms": _latency_summary(latencies),
+                "wer": errors / words if words else None,
+                "rss_mb": rss_after,
+                "rss_delta_mb": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            })
+            del model
+        except Exception as e:
+            entry["error"] = str(e)
+        results.append(entry)
+    return results
+
+# Runs in a fresh interpreter per measurement and prints timestamped events on stdout.
+_STARTUP_PROBE = r"""
+import json, os, sys, time
+HEAVY = ("torch", "whisper", "speechbrain", "scipy.signal")
+def mark(event, **extra):
+    print(json.dumps(dict(event=event, t=time.time(), **extra)), flush=True)
+mark("start")
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+from ui_main import MainWindow
+mark("imported")
+app = QApplication(sys.argv)
+window = MainWindow()
+window.voice_thread.ready_signal.connect(lambda: (mark("ready"), os._exit(0)))
+window.show()
+def first_window():
+    mark("first_window", heavy_loaded=[m for m in HEAVY if m in sys.modules])
+    if not {no_ready}:
+        window.start_voice_thread()
+    else:
+        os._exit(0)
+QTimer.singleShot(0, first_window)
+app.exec_()
+"""
+
+def bench_startup(args):
+    env = dict(os.environ)
+    if args.offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    probe = _STARTUP_PROBE.replace("{no_ready}", str(bool(args.window_only)))
+    runs = []
+    for _ in range(args.runs):
+        launched = time.time()
+        proc = subprocess.Popen([sys.executable, "-c", probe], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        events = {}
+        try:
+            out, _ = proc.communicate(timeout=args.timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            out, _ = proc.communicate()
+        for line in out.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            events[record.pop("event")] = record
+        run = {key: (events[name]["t"] - launched) * 1000 if name in events else None for key, name in (
+            ("interpreter_ms", "start"), ("imports_ms", "imported"),
+            ("first_window_ms", "first_window"), ("ready_ms", "ready"))}
+        run["exit_code"] = proc.returncode
+        run["heavy_modules_at_first_window"] = events.get("first_window", {}).get("heavy_loaded")
+        runs.append(run)
+    summary = {}
+    for key in ("imports_ms", "first_window_ms", "ready_ms"):
+        values = [r[key] for r in runs if r[key] is not None]
+        summary[key] = _latency_summary(values)
+    return {"runs": runs, "summary": summary}
+
+def bench_table(args):
+    if args.offscreen:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PyQt5.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+    from command_table import CommandTableModel, make_command_view
+    app = QApplication.instance() or QApplication([])
+    n = args.commands
+    commands = [{"title": f"Command {i}", "keyword": f"keyword {i}", "type": "app", "data": f"C:/Apps/app{i}.exe"}
+                for i in range(n)]
+    edited = list(commands)
+    edited[n // 2] = dict(edited[n // 2], title="Edited command")
+    added = commands + [{"title": "New", "keyword": "new keyword", "type": "app", "data": ""}]
+    deleted = commands[:n // 2] + commands[n // 2 + 1:]
+
+    def timed(steps):
+        times = []
+        for step in steps:
+            t0 = time.perf_counter()
+            step()
+            app.processEvents()
+            times.append((time.perf_counter() - t0) * 1000)
+        return _latency_summary(times)
+
+    # The table as it was refreshed before: every item recreated after each change.
+    widget = QTableWidget(0, 4)
+    widget.show()
+    def rebuild(cmds):
+        widget.setRowCount(len(cmds))
+        for i, cmd in enumerate(cmds):
+            for col, key in enumerate(("title", "keyword", "type", "data")):
+                widget.setItem(i, col, QTableWidgetItem(cmd.get(key, "")))
+    results = {"commands": n, "table_widget_refresh_ms": timed([lambda: rebuild(commands)] * args.repeat)}
+    widget.close()
+
+    model = CommandTableModel()
+    view = make_command_view(model)
+    view.show()
+    results["model_load_ms"] = timed([lambda: model.set_commands([]), lambda: model.set_commands(commands)] * args.repeat)
+    for name, changed in (("edit", edited), ("add", added), ("delete", deleted)):
+        results[f"model_{name}_ms"] = timed([lambda c=changed: model.set_commands(c),
+                                             lambda: model.set_commands(commands)] * args.repeat)
+    query = "keyword 12"
+    keystrokes = [lambda q=query[:i]: model.set_filter(q) for i in range(1, len(query) + 1)]
+    results["filter_keystroke_ms"] = timed((keystrokes + [lambda: model.set_filter("")]) * args.repeat)
+    view.close()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voice assistant benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("capture-rate", help="Compare capture at the model rate against 44.1 kHz + resampling")
+    p.add_argument("--rates", type=int, nargs="+", default=[audio_utils.MODEL_SAMPLE_RATE, 44100])
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--repeat", type=int, default=10)
+    p.add_argument("--blocksize", type=int, default=512)
+    p.add_argument("--models", action="store_true", help="Include Whisper transcription in the measured latency")
+    p.set_defaults(func=bench_capture_rate)
+
+    p = sub.add_parser("startup", help="Measure time to first window and time until models are ready")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for models to become ready")
+    p.add_argument("--window-only", action="store_true", help="Stop at the first window without loading models")
+    p.add_argument("--offscreen", action="store_true", help="Use Qt's offscreen platform (no display needed)")
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("table", help="Time command table refresh, edits and filtering at a large command count")
+    p.add_argument("--commands", type=int, default=10000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--offscreen", action="store_true", help="Use Qt's offscreen platform (no display needed)")
+    p.set_defaults(func=bench_table)
+
+    p = sub.add_parser("backends", help="Compare ASR backends on WAVs with .txt reference transcripts")
+    p.add_argument("corpus", help="Directory of .wav files with <name>.txt reference transcripts")
+    p.add_argument("--backends", nargs="+", default=["whisper", "whisper-int8", "faster-whisper"],
+                   help="backend[:model_size] entries, e.g. whisper:small whisper-int8:base")
+    p.add_argument("--device", default=None, help="auto, cpu or cuda (default: from settings)")
+    p.add_argument("--cpu-threads", type=int, default=0)
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("replay", help="Replay a directory of WAV files through the command pipeline")
+    p.add_argument("corpus", help="Directory of .wav files (optionally with labels.json and .txt transcripts)")
+    p.add_argument("--labels", help="JSON file mapping file name to the expected command keyword (\"\" for none)")
+    p.add_argument("--models", choices=["stub", "real"], default="stub")
+    p.add_argument("--stub-rtf", type=float, default=0.0, help="Simulated stub inference time as a fraction of clip length")
+    p.add_argument("--verify", action="store_true", help="Include speaker verification")
+    p.add_argument("--execute", action="store_true", help="Actually launch matched apps/browsers")
+    p.add_argument("--config", help="Config file to take commands from (default: config.json)")
+    p.add_argument("--per-file", action="store_true", help="Include per-file results in the report")
+    p.set_defaults(func=bench_replay)
+
+    args = parser.parse_args(argv)
+    json.dump(args.func(args), sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
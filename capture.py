@@ -0,0 +1,74 @@
+import numpy as np
+
+# Fixed-size float32 ring written from the PortAudio callback. Positions are absolute
+# sample counts, so a recording is just a (start, end) pair read back after release.
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=np.float32)
+        self.position = 0
+
+    def write(self, samples):
+        total = n = len(samples)
+        pos = self.position
+        if n >= self.capacity:
+            samples = samples[-self.capacity:]
+            pos += n - self.capacity
+            n = self.capacity
+        idx = pos % self.capacity
+        first = min(n, self.capacity - idx)
+        self.data[idx:idx + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        # Publish only after the samples are in place so readers never see stale data.
+        self.position += total
+
+    def oldest(self):
+        return max(0, self.position - self.capacity)
+
+    def mark(self, preroll=0):
+        return max(self.oldest(), self.position - int(preroll))
+
+    def read(self, start, end=None):
+        end = self.position if end is None else min(end, self.position)
+        start = max(start, self.oldest())
+        n = end - start
+        if n <= 0:
+            return np.zeros(0, dtype=np.float32)
+        idx = start % self.capacity
+        if idx + n <= self.capacity:
+            return self.data[idx:idx + n].copy()
+        return np.concatenate((self.data[idx:], self.data[:idx + n - self.capacity]))
+
+# Fixed-length recording taken from a RingBuffer that is already being filled, so the
+# PortAudio callback does no extra work. poll() copies whatever the ring gained since the
+# last call and returns (fraction done, level of the new samples in dBFS).
+class RingRecording:
+    def __init__(self, ring, samplerate, seconds):
+        self.ring = ring
+        self.samplerate = samplerate
+        self.start = ring.position
+        self.end = self.start + int(samplerate * seconds)
+        self.lost = 0
+        self.cancelled = False
+        self._pos = self.start
+        self._chunks = []
+
+    @property
+    def done(self):
+        return self._pos >= self.end
+
+    def poll(self):
+        end = min(self.ring.position, self.end)
+        if self.ring.oldest() > self._pos:
+            self.lost += self.ring.oldest() - self._pos
+        chunk = self.ring.read(self._pos, end)
+        self._pos = end
+        self._chunks.append(chunk)
+        level = 10 * np.log10(np.mean(chunk.astype(np.float64) ** 2) + 1e-10) if len(chunk) else -100.0
+        return (self._pos - self.start) / (self.end - self.start), float(level)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def audio(self):
+        return np.concatenate(self._chunks) if self._chunks else np.zeros(0, dtype=np.float32)
@@ -0,0 +1,173 @@
+import re
+from collections import defaultdict, deque
+from difflib import SequenceMatcher
+
+# Aho-Corasick automaton over command keywords: one pass over the transcription finds
+# every keyword occurrence, regardless of how many commands are configured.
+class CommandMatcher:
+    def __init__(self, commands):
+        self.commands = list(commands)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for idx, cmd in enumerate(self.commands):
+            kw = cmd.get("keyword", "").lower()
+            if kw:
+                self._insert(kw, idx)
+        self._link()
+
+    def _insert(self, kw, idx):
+        node = 0
+        for ch in kw:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node].append((len(kw), idx))
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        hits = []
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, idx in out[node]:
+                hits.append((i + 1 - length, i + 1, idx))
+        return hits
+
+    def match(self, text, allowed=None):
+        # Longest keyword wins; ties go to the earliest occurrence, then to list order.
+        hits = self.find_all(text)
+        if allowed is not None:
+            hits = [h for h in hits if allowed(self.commands[h[2]])]
+        if not hits:
+            return None
+        start, end, idx = max(hits, key=lambda h: (h[1] - h[0], -h[0], -h[2]))
+        return self.commands[idx], start, end
+
+    def __len__(self):
+        return len(self.commands)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_DIGRAPHS = (("ph", "f"), ("ck", "k"), ("gh", "g"), ("sch", "sk"), ("qu", "kw"))
+_SOUND_CLASSES = str.maketrans("bfpvcgjkqsxzdtlmnr", "111122222222334556")
+
+def phonetic_key(word):
+    # Soundex-style classes over the whole word (not truncated): first letter kept, vowels
+    # and h/w/y dropped after it, repeated classes collapsed.
+    for a, b in _DIGRAPHS:
+        word = word.replace(a, b)
+    if not word:
+        return ""
+    key = word[0]
+    prev = word[0].translate(_SOUND_CLASSES)
+    for ch in word[1:]:
+        code = ch.translate(_SOUND_CLASSES)
+        if code == ch and not ch.isdigit():
+            prev = ""
+            continue
+        if code != prev:
+            key += code
+        prev = code
+    return key
+
+def char_ngrams(word, n=3):
+    padded = f"#{word}#"
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+# Approximate keyword lookup for when Whisper splits, merges or misspells a keyword
+# ("wiki pedia", "in cognito"). Keywords are compared with their spaces removed, scored by
+# trigram overlap and phonetic-key similarity. An inverted trigram index narrows the
+# candidates, so scoring only touches keywords sharing grams with the transcription.
+# update() applies a new command list by diffing keywords instead of rebuilding.
+class FuzzyIndex:
+    def __init__(self, commands=(), ngram_weight=0.6, min_overlap=0.3):
+        self.ngram_weight = ngram_weight
+        self.min_overlap = min_overlap
+        self.commands = []
+        self._entries = {}
+        self._postings = defaultdict(set)
+        self.update(commands)
+
+    def update(self, commands):
+        self.commands = list(commands)
+        by_keyword = {}
+        for idx, cmd in enumerate(self.commands):
+            words = _WORD.findall(cmd.get("keyword", "").lower())
+            if words:
+                by_keyword.setdefault(" ".join(words), []).append(idx)
+        for kw in set(self._entries) - set(by_keyword):
+            for gram in self._entries.pop(kw)["grams"]:
+                self._postings[gram].discard(kw)
+                if not self._postings[gram]:
+                    del self._postings[gram]
+        for kw, indices in by_keyword.items():
+            entry = self._entries.get(kw)
+            if entry is None:
+                compact = kw.replace(" ", "")
+                entry = self._entries[kw] = {
+                    "compact": compact,
+                    "grams": char_ngrams(compact),
+                    "key": phonetic_key(compact),
+                    "words": kw.count(" ") + 1,
+                }
+                for gram in entry["grams"]:
+                    self._postings[gram].add(kw)
+            entry["commands"] = indices
+
+    def score(self, entry, compact, grams):
+        if compact == entry["compact"]:
+            return 1.0
+        dice = 2 * len(grams & entry["grams"]) / (len(grams) + len(entry["grams"]))
+        phon = SequenceMatcher(None, phonetic_key(compact), entry["key"]).ratio()
+        return self.ngram_weight * dice + (1 - self.ngram_weight) * phon
+
+    def best(self, text, allowed=None):
+        # Returns (command, start, end, score) for the best-scoring keyword and the span of
+        # text it was matched against, or None when no keyword shares enough trigrams.
+        words = [(m.start(), m.end(), m.group()) for m in _WORD.finditer(text)]
+        if not words:
+            return None
+        grams = char_ngrams("".join(w for _, _, w in words)).union(*(char_ngrams(w) for _, _, w in words))
+        counts = defaultdict(int)
+        for gram in grams:
+            for kw in self._postings.get(gram, ()):
+                counts[kw] += 1
+        spans = {}
+        best = None
+        for kw, shared in counts.items():
+            entry = self._entries[kw]
+            if shared < self.min_overlap * len(entry["grams"]):
+                continue
+            indices = [i for i in entry["commands"] if allowed is None or allowed(self.commands[i])]
+            if not indices:
+                continue
+            # Whisper may split a keyword into more words or merge it into fewer.
+            for n in range(max(1, entry["words"] - 1), entry["words"] + 3):
+                for i in range(len(words) - n + 1):
+                    span = spans.get((i, n))
+                    if span is None:
+                        compact = "".join(w for _, _, w in words[i:i + n])
+                        span = spans[(i, n)] = (compact, char_ngrams(compact))
+                    s = self.score(entry, *span)
+                    if best is None or s > best[3]:
+                        best = (self.commands[indices[0]], words[i][0], words[i + n - 1][1], s)
+        return best
@@ -0,0 +1,113 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtWidgets import QHeaderView, QTableView
+
+COLUMNS = (("Title", "title"), ("Keyword", "keyword"), ("Type", "type"), ("Data", "data"))
+
+def _haystack(cmd, columns):
+    return "\t".join(str(cmd.get(key, "")) for _, key in columns).lower()
+
+# Table model over the cached command list; the view only asks for the rows it paints.
+# set_commands() diffs against the rows it already has and signals just the changed span
+# between the unchanged head and tail, so an add, edit or delete touches one row. The
+# filter matches a lowercase haystack kept per command; when the query only grows, only the
+# rows still shown are rescanned.
+class CommandTableModel(QAbstractTableModel):
+    def __init__(self, commands=(), columns=COLUMNS, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self._commands = []
+        self._haystacks = []
+        self._query = ""
+        self._rows = None  # command indices matching the filter; None while unfiltered
+        self.set_commands(commands)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._commands) if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        cmd = self._commands[self.command_index(index.row())]
+        return str(cmd.get(self.columns[index.column()][1], ""))
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return super().headerData(section, orientation, role)
+
+    def command_index(self, row):
+        return row if self._rows is None else self._rows[row]
+
+    def set_commands(self, commands):
+        new = list(commands)
+        if self._rows is not None:
+            self.beginResetModel()
+            self._commands = new
+            self._haystacks = [_haystack(c, self.columns) for c in new]
+            self._rows = self._matching(range(len(new)), self._query)
+            self.endResetModel()
+            return
+        old = self._commands
+        limit = min(len(old), len(new))
+        head = 0
+        while head < limit and old[head] == new[head]:
+            head += 1
+        tail = 0
+        while tail < limit - head and old[len(old) - 1 - tail] == new[len(new) - 1 - tail]:
+            tail += 1
+        old_end, new_end = len(old) - tail, len(new) - tail
+        common = min(old_end, new_end) - head
+        if common:
+            old[head:head + common] = new[head:head + common]
+            self._haystacks[head:head + common] = [_haystack(c, self.columns) for c in new[head:head + common]]
+            self.dataChanged.emit(self.index(head, 0), self.index(head + common - 1, len(self.columns) - 1))
+        start = head + common
+        if new_end > old_end:
+            self.beginInsertRows(QModelIndex(), start, new_end - 1)
+            old[start:start] = new[start:new_end]
+            self._haystacks[start:start] = [_haystack(c, self.columns) for c in new[start:new_end]]
+            self.endInsertRows()
+        elif old_end > new_end:
+            self.beginRemoveRows(QModelIndex(), start, old_end - 1)
+            del old[start:old_end]
+            del self._haystacks[start:old_end]
+            self.endRemoveRows()
+
+    def set_filter(self, text):
+        query = text.strip().lower()
+        if query == self._query:
+            return
+        if not query:
+            rows = None
+        elif self._rows is not None and self._query in query:
+            rows = self._matching(self._rows, query)
+        else:
+            rows = self._matching(range(len(self._commands)), query)
+        self.beginResetModel()
+        self._query = query
+        self._rows = rows
+        self.endResetModel()
+
+    def _matching(self, candidates, query):
+        haystacks = self._haystacks
+        return [i for i in candidates if query in haystacks[i]]
+
+# Fixed row heights and no content-based column sizing, so painting cost follows the
+# visible rows rather than the number of commands.
+def make_command_view(model):
+    view = QTableView()
+    view.setModel(model)
+    view.setEditTriggers(QTableView.NoEditTriggers)
+    view.setSelectionBehavior(QTableView.SelectRows)
+    view.setSelectionMode(QTableView.SingleSelection)
+    view.setWordWrap(False)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 6)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+    view.horizontalHeader().setStretchLastSection(True)
+    return view
@@ -1,98 +1,252 @@
 import json
 import os
+import copy
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
 
 CONFIG_FILE = "config.json"
+# Offline tools (replay, batch, history rerun) read the defaults without writing a config file.
+CREATE_MISSING = True
+
+DEFAULT_BROWSER_COMMANDS = [
+    {"title": "Search",    "keyword": "search",    "type": "browser_search",  "data": "https://www.google.com/search?q={query}"},
+    {"title": "Wikipedia", "keyword": "wikipedia", "type": "browser_search",  "data": "https://en.wikipedia.org/wiki/{query}"},
+    {"title": "Browser",   "keyword": "browser",   "type": "browser_control", "data": "open"},
+    {"title": "New Tab",   "keyword": "new tab",   "type": "browser_control", "data": "new_tab"},
+    {"title": "Incognito", "keyword": "incognito", "type": "browser_control", "data": "incognito"}
+]
+
+def get_default_commands(config):
+    return list(DEFAULT_BROWSER_COMMANDS) if config.get("main_browser") else []
+
+def get_all_commands(config):
+    return get_default_commands(config) + config.get("commands", [])
+
+# Process-wide cache of config.json, reloaded only when the file's mtime changes.
+# load_config() returns the shared snapshot: treat it as read-only and make changes
+# through the setters or transaction(), which write a modified copy.
+_lock = threading.RLock()
+_cache = None
+_cache_mtime = None
+_txn = None
+_listeners = []
+_commands_version = 0
+
+def _default_config():
+    return {
+        "commands": [],
+        "main_browser": "",
+        "trigger_key": "]",
+        "speaker_recognition_enabled": False,
+        "enrollments": {},
+        "enrollment_embeddings": {},
+        "active_enrollment": "",
+        "speaker_mode": "verify",
+        "save_last_recording": True,
+        "streaming_transcription": False,
+        "streaming_window_seconds": 4.0,
+        "capture_samplerate": 16000,
+        "preroll_seconds": 0.3,
+        "max_recording_seconds": 60,
+        "speculative_transcription": True,
+        "command_decoding": True,
+        "command_max_tokens": 24,
+        "fuzzy_matching": True,
+        "fuzzy_threshold": 0.75,
+        "vad_enabled": True,
+        "listening_mode": "push_to_talk",
+        "wake_phrase": "",
+        "inference_backend": "thread",
+        "asr_backend": "whisper",
+        "whisper_model": "small",
+        "device": "auto",
+        "cpu_threads": 0,
+        "job_queue_size": 2,
+        "job_queue_policy": "drop_oldest",
+        "log_max_lines": 5000,
+        "log_flush_ms": 200,
+        "history_enabled": True,
+        "history_dir": "history",
+        "history_max_entries": 500,
+        "history_max_bytes": 100_000_000,
+        "history_segment_bytes": 8_000_000,
+        "metrics_file": "metrics.jsonl",
+        "metrics_max_bytes": 5000000,
+        "metrics_backups": 3
+    }
+
+def subscribe(callback):
+    # callback(config, changed_keys) runs on the thread that saved or detected the change.
+    with _lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+
+def unsubscribe(callback):
+    with _lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+# Bumped whenever commands (or the browser, which enables the defaults) change, so
+# callers can rebuild derived structures such as the keyword matcher lazily.
+def commands_version():
+    return _commands_version
+
+def _replace_cache(config, mtime):
+    global _cache, _cache_mtime, _commands_version
+    old = _cache or {}
+    _cache, _cache_mtime = config, mtime
+    changed = {k for k in set(old) | set(config) if old.get(k) != config.get(k)}
+    if changed & {"commands", "main_browser"}:
+        _commands_version += 1
+    return changed
+
+def _notify(config, changed):
+    if not changed:
+        return
+    for callback in list(_listeners):
+        try:
+            callback(config, changed)
+        except Exception as e:
+            print("Config listener error: " + str(e))
 
 def load_config():
-    if not os.path.exists(CONFIG_FILE):
-        default_config = {
-            "commands": [],
-            "main_browser": "",
-            "trigger_key": "]",
-            "speaker_recognition_enabled": False,
-            "enrollments": {},
-            "active_enrollment": ""
-        }
-        save_config(default_config)
-        return default_config
-    with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+    with _lock:
+        if _txn is not None:
+            return _txn
+        if not os.path.exists(CONFIG_FILE):
+            default_config = _default_config()
+            if CREATE_MISSING:
+                save_config(default_config)
+            return default_config
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+        if _cache is not None and mtime == _cache_mtime:
+            return _cache
+        with open(CONFIG_FILE, "r") as f:
+            config = json.load(f)
+        external = _cache is not None
+        changed = _replace_cache(config, mtime)
+    if external:
+        _notify(config, changed)
+    return config
 
 def save_config(config):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=4)
+    with _lock:
+        # A temp file of our own: other processes (the GUI, batch workers) save concurrently.
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(CONFIG_FILE) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(os.path.abspath(CONFIG_FILE)))
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(config, f, indent=4)
+            os.replace(tmp, CONFIG_FILE)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        changed = _replace_cache(config, os.stat(CONFIG_FILE).st_mtime_ns)
+    _notify(config, changed)
+
+@contextmanager
+def transaction():
+    # Groups several setters into one atomic write; nested transactions join the outer one.
+    global _txn
+    with _lock:
+        if _txn is not None:
+            yield _txn
+            return
+        _txn = copy.deepcopy(load_config())
+        try:
+            yield _txn
+            config = _txn
+        finally:
+            _txn = None
+        save_config(config)
 
 def add_command_entry(entry):
-    config = load_config()
-    for cmd in config.get("commands", []):
-        if cmd["keyword"].lower() == entry["keyword"].lower():
-            raise ValueError("Keyword must be unique.")
-    config["commands"].append(entry)
-    save_config(config)
+    with transaction() as config:
+        for cmd in config.get("commands", []):
+            if cmd["keyword"].lower() == entry["keyword"].lower():
+                raise ValueError("Keyword must be unique.")
+        config["commands"].append(entry)
 
 def update_command_entry(index, entry):
-    config = load_config()
-    cmds = config.get("commands", [])
-    if index < 0 or index >= len(cmds):
-        raise IndexError("Invalid command index.")
-    for i, cmd in enumerate(cmds):
-        if i != index and cmd["keyword"].lower() == entry["keyword"].lower():
-            raise ValueError("Keyword must be unique.")
-    cmds[index] = entry
-    config["commands"] = cmds
-    save_config(config)
+    with transaction() as config:
+        cmds = config.get("commands", [])
+        if index < 0 or index >= len(cmds):
+            raise IndexError("Invalid command index.")
+        for i, cmd in enumerate(cmds):
+            if i != index and cmd["keyword"].lower() == entry["keyword"].lower():
+                raise ValueError("Keyword must be unique.")
+        cmds[index] = entry
+        config["commands"] = cmds
 
 def delete_command_entry(index):
-    config = load_config()
-    cmds = config.get("commands", [])
-    if index < 0 or index >= len(cmds):
-        raise IndexError("Invalid command index.")
-    del cmds[index]
-    config["commands"] = cmds
-    save_config(config)
+    with transaction() as config:
+        cmds = config.get("commands", [])
+        if index < 0 or index >= len(cmds):
+            raise IndexError("Invalid command index.")
+        del cmds[index]
+        config["commands"] = cmds
 
 def set_main_browser(path):
-    config = load_config()
-    config["main_browser"] = path
-    save_config(config)
+    with transaction() as config:
+        config["main_browser"] = path
 
 def set_trigger_key(key):
-    config = load_config()
-    config["trigger_key"] = key
-    save_config(config)
+    with transaction() as config:
+        config["trigger_key"] = key
 
 # — New speaker‑recognition config functions —
 def set_speaker_recognition_enabled(enabled):
-    config = load_config()
-    config["speaker_recognition_enabled"] = bool(enabled)
-    save_config(config)
+    with transaction() as config:
+        config["speaker_recognition_enabled"] = bool(enabled)
 
 def add_enrollment(name, file_path):
-    config = load_config()
-    enrollments = config.get("enrollments", {})
-    if name in enrollments:
-        raise ValueError(f"Enrollment '{name}' already exists.")
-    enrollments[name] = file_path
-    config["enrollments"] = enrollments
-    if not config.get("active_enrollment"):
-        config["active_enrollment"] = name
-    save_config(config)
+    with transaction() as config:
+        enrollments = config.get("enrollments", {})
+        if name in enrollments:
+            raise ValueError(f"Enrollment '{name}' already exists.")
+        enrollments[name] = file_path
+        config["enrollments"] = enrollments
+        if not config.get("active_enrollment"):
+            config["active_enrollment"] = name
 
 def delete_enrollment(name):
-    config = load_config()
-    enrollments = config.get("enrollments", {})
-    if name not in enrollments:
-        raise ValueError(f"Enrollment '{name}' not found.")
-    del enrollments[name]
-    config["enrollments"] = enrollments
-    if config.get("active_enrollment") == name:
-        config["active_enrollment"] = next(iter(enrollments), "")
-    save_config(config)
+    with transaction() as config:
+        enrollments = config.get("enrollments", {})
+        if name not in enrollments:
+            raise ValueError(f"Enrollment '{name}' not found.")
+        del enrollments[name]
+        config["enrollments"] = enrollments
+        config.get("enrollment_embeddings", {}).pop(name, None)
+        if config.get("active_enrollment") == name:
+            config["active_enrollment"] = next(iter(enrollments), "")
 
 def set_active_enrollment(name):
-    config = load_config()
-    enrollments = config.get("enrollments", {})
-    if name not in enrollments:
-        raise ValueError(f"Enrollment '{name}' not found.")
-    config["active_enrollment"] = name
-    save_config(config)
+    with transaction() as config:
+        enrollments = config.get("enrollments", {})
+        if name not in enrollments:
+            raise ValueError(f"Enrollment '{name}' not found.")
+        config["active_enrollment"] = name
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def get_enrollment_embedding(name, file_hash):
+    entry = load_config().get("enrollment_embeddings", {}).get(name)
+    if not entry or entry.get("sha256") != file_hash:
+        return None
+    return entry.get("embedding")
+
+def set_enrollment_embedding(name, file_hash, embedding):
+    with transaction() as config:
+        if name not in config.get("enrollments", {}):
+            raise ValueError(f"Enrollment '{name}' not found.")
+        embeddings = config.get("enrollment_embeddings", {})
+        embeddings[name] = {"sha256": file_hash, "embedding": [float(x) for x in embedding]}
+        config["enrollment_embeddings"] = embeddings
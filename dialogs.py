@@ -1,11 +1,12 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QLabel, QLineEdit,
     QPushButton, QFileDialog, QDialogButtonBox,
-    QComboBox, QCheckBox, QTextEdit
+    QComboBox, QCheckBox
 )
 from PyQt5.QtCore import Qt
 
 import config_manager
+from command_table import CommandTableModel, make_command_view
 
 class AddEditCommandDialog(QDialog):
     def __init__(self, parent=None, title="", keyword="", cmd_type="app", data=""):
@@ -143,34 +144,25 @@ class ShowCommandsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Viable Commands")
+        self.resize(600, 400)
         layout = QVBoxLayout()
-        commands_text = ""
 
         try:
             config = config_manager.load_config()
         except Exception:
             config = {}
 
-        if config.get("main_browser"):
-            default_commands = [
-                {"title": "Search", "keyword": "search", "type": "browser_search",
-                 "data": "https://www.google.com/search?q={query}"},
-                {"title": "Wikipedia", "keyword": "wikipedia", "type": "browser_search",
-                 "data": "https://en.wikipedia.org/wiki/{query}"},
-                {"title": "Browser", "keyword": "browser", "type": "browser_control", "data": "open"},
-                {"title": "New Tab", "keyword": "new tab", "type": "browser_control", "data": "new_tab"},
-                {"title": "Incognito", "keyword": "incognito", "type": "browser_control", "data": "incognito"}
-            ]
-            for cmd in default_commands:
-                commands_text += f"Type '{cmd['keyword']}' to {cmd['title']} (Default)\n"
-
-        for cmd in config.get("commands", []):
-            commands_text += f"Type '{cmd['keyword']}' to {cmd.get('title','')} (Custom)\n"
-
-        text_edit = QTextEdit()
-        text_edit.setReadOnly(True)
-        text_edit.setText(commands_text)
-        layout.addWidget(text_edit)
+        commands = [dict(cmd, source="Default") for cmd in config_manager.get_default_commands(config)]
+        commands += [dict(cmd, source="Custom") for cmd in config.get("commands", [])]
+        self.model = CommandTableModel(
+            commands, columns=(("Keyword", "keyword"), ("Action", "title"), ("Source", "source")), parent=self
+        )
+        filter_edit = QLineEdit()
+        filter_edit.setPlaceholderText("Filter commands...")
+        filter_edit.setClearButtonEnabled(True)
+        filter_edit.textChanged.connect(self.model.set_filter)
+        layout.addWidget(filter_edit)
+        layout.addWidget(make_command_view(self.model))
 
         close_button = QPushButton("Close")
         close_button.clicked.connect(self.accept)
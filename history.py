@@ -0,0 +1,183 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import audio_utils
+
+# Append-only archive of recent utterances. Audio goes into int16 segment files
+# (seg_000001.pcm, ...) that are only ever appended to; index.jsonl holds one line per entry
+# with where its samples live plus what the assistant made of it. Retention is by entry count
+# and audio bytes: the oldest entries are dropped from the index and a segment file is deleted
+# once none of its entries remain, so disk use stays within the limit plus one open segment.
+# Going over a limit trims down to 90% of it, so the index is rewritten once every tenth of
+# the limit rather than on every append.
+# load() maps just the entry's samples with numpy.memmap.
+class RecordingHistory:
+    def __init__(self, directory="history", max_entries=500, max_bytes=100_000_000, segment_bytes=8_000_000):
+        self.directory = directory
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = int(max_bytes)
+        self.segment_bytes = int(segment_bytes)
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.entries = self._read_index()
+        self.bytes = sum(e["samples"] * 2 for e in self.entries)
+        segments = sorted(glob.glob(os.path.join(directory, "seg_*.pcm")))
+        self._segment = int(os.path.basename(segments[-1])[4:10]) if segments else 1
+        self._next_id = self.entries[-1]["id"] + 1 if self.entries else 1
+
+    def _read_index(self):
+        entries = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # a line cut short by a crash mid-append
+        return [e for e in entries if os.path.exists(self._segment_path(e["segment"]))]
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"seg_{segment:06d}.pcm")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, entry_id):
+        with self._lock:
+            for entry in self.entries:
+                if entry["id"] == entry_id:
+                    return entry
+        raise KeyError(f"No history entry #{entry_id}.")
+
+    def append(self, audio, samplerate, **info):
+        pcm = (np.clip(np.asarray(audio, dtype=np.float32).reshape(-1), -1.0, 1.0) * 32767).astype("<i2")
+        with self._lock:
+            path = self._segment_path(self._segment)
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            if offset and offset + pcm.nbytes > self.segment_bytes:
+                self._segment += 1
+                path, offset = self._segment_path(self._segment), 0
+            with open(path, "ab") as f:
+                f.write(pcm.tobytes())
+            entry = {
+                "id": self._next_id,
+                "timestamp": time.time(),
+                "duration": len(pcm) / samplerate,
+                "samplerate": int(samplerate),
+                "segment": self._segment,
+                "offset": offset,
+                "samples": len(pcm),
+            }
+            entry.update(info)
+            self._next_id += 1
+            self.entries.append(entry)
+            self.bytes += pcm.nbytes
+            if len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._evict()
+            else:
+                with open(self.index_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return entry
+
+    def _evict(self, low_water=0.9):
+        max_entries = max(1, int(self.max_entries * low_water))
+        max_bytes = int(self.max_bytes * low_water)
+        while len(self.entries) > 1 and (len(self.entries) > max_entries or self.bytes > max_bytes):
+            self.bytes -= self.entries.pop(0)["samples"] * 2
+        live = {e["segment"] for e in self.entries} | {self._segment}
+        for path in glob.glob(os.path.join(self.directory, "seg_*.pcm")):
+            if int(os.path.basename(path)[4:10]) not in live:
+                os.remove(path)
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.index_path)
+
+    def load(self, entry_or_id):
+        entry = entry_or_id if isinstance(entry_or_id, dict) else self.get(entry_or_id)
+        if entry["samples"] == 0:
+            return np.zeros(0, dtype=np.float32), entry["samplerate"]
+        pcm = np.memmap(self._segment_path(entry["segment"]), dtype="<i2", mode="r",
+                        offset=entry["offset"], shape=(entry["samples"],))
+        return pcm.astype(np.float32) / 32767.0, entry["samplerate"]
+
+    def latest(self):
+        with self._lock:
+            return self.entries[-1] if self.entries else None
+
+def open_history(config, directory=None):
+    return RecordingHistory(
+        directory or config.get("history_dir", "history"),
+        config.get("history_max_entries", 500),
+        config.get("history_max_bytes", 100_000_000),
+        config.get("history_segment_bytes", 8_000_000),
+    )
+
+def rerun(history, entry_ids, execute=False):
+    # Same offline pipeline as the replay benchmark, with real models.
+    from benchmark import make_replay_assistant
+    from job_queue import Job
+    import config_manager
+    verify = config_manager.load_config().get("speaker_recognition_enabled", False)
+    assistant = make_replay_assistant(execute=execute, verify=verify)
+    results = []
+    for entry_id in entry_ids:
+        entry = history.get(entry_id)
+        audio, rate = history.load(entry)
+        job = Job(audio, samplerate=rate)
+        assistant.process_audio(job)
+        results.append({
+            "id": entry_id,
+            "before": {"transcript": entry.get("transcript"), "command": entry.get("command")},
+            "after": {"transcript": job.transcription, "command": (job.command or {}).get("title"),
+                      "status": job.status, "spans_ms": job.timings},
+        })
+    return results
+
+def main(argv=None):
+    import config_manager
+    parser = argparse.ArgumentParser(description="Inspect and replay the recording history")
+    parser.add_argument("--dir", help="History directory (default: from config)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("list", help="Show the most recent entries")
+    p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("export", help="Write an entry to a WAV file")
+    p.add_argument("id", type=int)
+    p.add_argument("path")
+    p = sub.add_parser("play", help="Play an entry on the default output device")
+    p.add_argument("id", type=int)
+    p = sub.add_parser("rerun", help="Run entries through the command pipeline again (nothing is launched)")
+    p.add_argument("ids", type=int, nargs="+")
+    p.add_argument("--execute", action="store_true", help="Actually launch matched apps/browsers")
+    args = parser.parse_args(argv)
+
+    config_manager.CREATE_MISSING = False
+    history = open_history(config_manager.load_config(), args.dir)
+    if args.command == "list":
+        for entry in history.entries[-args.limit:]:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["timestamp"]))
+            score = entry.get("speaker_score")
+            speaker = f" speaker={entry.get('speaker')} ({score:.2f})" if score is not None else ""
+            print(f"#{entry['id']} {stamp} {entry['duration']:.2f}s [{entry.get('status')}] "
+                  f"'{entry.get('transcript') or ''}' -> {entry.get('command')}{speaker}")
+    elif args.command == "export":
+        audio, rate = history.load(args.id)
+        audio_utils.write_wav(args.path, audio, rate)
+    elif args.command == "play":
+        import sounddevice as sd
+        audio, rate = history.load(args.id)
+        sd.play(audio, rate)
+        sd.wait()
+    else:
+        print(json.dumps(rerun(history, args.ids, args.execute), indent=2))
+
+if __name__ == "__main__":
+    main()
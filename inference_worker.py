@@ -0,0 +1,143 @@
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import model_registry
+
+def _transcribe(audio, prompt=None, options=None):
+    return model_registry.transcribe(audio, initial_prompt=prompt, **(options or {})).get("text", "")
+
+def _embed(audio):
+    return model_registry.embed(audio).tolist()
+
+def _embed_file(audio, path):
+    return model_registry.embed_file(path).tolist()
+
+_OPS = {"transcribe": _transcribe, "embed": _embed, "embed_file": _embed_file}
+
+def _worker_main(requests, results, names, options):
+    log = lambda msg: results.put((None, "log", msg))
+    model_registry.configure(**options)
+    model_registry.warm_up(names, log)
+    results.put((None, "ready", None))
+    while True:
+        req = requests.get()
+        if req is None:
+            break
+        req_id, op, shm_name, length, kwargs = req
+        shm = audio = None
+        try:
+            if shm_name:
+                # Attach to the parent's block; the array is a view, not a copy.
+                shm = shared_memory.SharedMemory(name=shm_name)
+                audio = np.ndarray((length,), dtype=np.float32, buffer=shm.buf)
+            results.put((req_id, "ok", _OPS[op](audio, **kwargs)))
+        except Exception as e:
+            results.put((req_id, "error", str(e)))
+        finally:
+            audio = None
+            if shm:
+                shm.close()
+
+# Keeps Whisper/ECAPA resident in a child process so decoding never holds the GUI's GIL.
+# call() blocks the calling thread until the child answers; a monitor thread relays child
+# log lines, detects crashes and restarts the child, failing whatever was in flight.
+class InferenceWorker:
+    def __init__(self, names, log=print, timeout=300, options=None):
+        self.names = list(names)
+        self.options = dict(options or model_registry.settings)
+        self.log = log
+        self.timeout = timeout
+        self.restarts = 0
+        self._ctx = mp.get_context("spawn")
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stopping = False
+        self.ready = threading.Event()
+        self._start_process()
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def _start_process(self):
+        self.ready.clear()
+        self.requests = self._ctx.Queue()
+        self.results = self._ctx.Queue()
+        self.process = self._ctx.Process(
+            target=_worker_main, args=(self.requests, self.results, self.names, self.options), daemon=True
+        )
+        self.process.start()
+        self.log(f"Inference worker started (pid {self.process.pid}).")
+
+    def call(self, op, audio=None, **kwargs):
+        shm = None
+        length = 0
+        if audio is not None:
+            audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+            length = len(audio)
+            shm = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 1))
+            np.ndarray((length,), dtype=np.float32, buffer=shm.buf)[:] = audio
+        req_id = next(self._ids)
+        slot = {"event": threading.Event()}
+        try:
+            with self._lock:
+                self._pending[req_id] = slot
+                self.requests.put((req_id, op, shm.name if shm else None, length, kwargs))
+            if not slot["event"].wait(self.timeout):
+                raise TimeoutError(f"Inference worker did not answer '{op}' within {self.timeout}s")
+            if slot["status"] != "ok":
+                raise RuntimeError(slot["value"])
+            return slot["value"]
+        finally:
+            with self._lock:
+                self._pending.pop(req_id, None)
+            if shm:
+                shm.close()
+                shm.unlink()
+
+    def _monitor(self):
+        while not self._stopping:
+            try:
+                req_id, status, value = self.results.get(timeout=0.5)
+            except queue.Empty:
+                if not self._stopping and not self.process.is_alive():
+                    self._restart()
+                continue
+            except (EOFError, OSError):
+                continue
+            if req_id is None:
+                if status == "ready":
+                    self.ready.set()
+                else:
+                    self.log(value)
+                continue
+            with self._lock:
+                slot = self._pending.get(req_id)
+            if slot:
+                slot["status"], slot["value"] = status, value
+                slot["event"].set()
+
+    def _restart(self):
+        self.log(f"Inference worker exited (code {self.process.exitcode}); restarting.")
+        self.restarts += 1
+        time.sleep(min(self.restarts, 10))
+        with self._lock:
+            if not self._stopping:
+                self._start_process()
+            # Anything sent before the swap went to the dead child and will never be answered.
+            for slot in self._pending.values():
+                slot["status"], slot["value"] = "error", "Inference worker crashed"
+                slot["event"].set()
+
+    def stop(self):
+        self._stopping = True
+        try:
+            self.requests.put(None)
+            self.process.join(timeout=5)
+        finally:
+            if self.process.is_alive():
+                self.process.terminate()
@@ -0,0 +1,103 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+POLICIES = ("drop_oldest", "drop_newest", "supersede")
+
+_job_ids = itertools.count(1)
+
+class Job:
+    def __init__(self, audio, streamer=None, wake_phrase="", samplerate=None):
+        self.id = next(_job_ids)
+        self.audio = audio
+        self.samplerate = samplerate
+        self.streamer = streamer
+        self.wake_phrase = wake_phrase
+        self.created = time.perf_counter()
+        self.cancelled = False
+        # Filled in by the handler so callers (benchmarks, batch runs) can inspect the outcome.
+        self.status = "queued"
+        self.timings = {}
+        self.transcription = None
+        self.command = None
+        self.speaker = None
+        self.speaker_score = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.streamer:
+            self.streamer.cancel()
+
+# Single fixed worker draining a bounded queue in order. When the queue is full, the policy
+# decides what gives: drop the oldest queued job, reject the new one, or ("supersede") cancel
+# everything older, including the job in flight, so only the newest utterance runs.
+class UtteranceScheduler:
+    def __init__(self, handler, maxsize=2, policy="drop_oldest", log=print):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}'.")
+        self.handler = handler
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.log = log
+        self.current = None
+        self.processed = 0
+        self.dropped = 0
+        self.last_wait_ms = 0.0
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, job):
+        with self._cond:
+            dropped = []
+            if self.policy == "supersede":
+                dropped = list(self._jobs)
+                self._jobs.clear()
+                if self.current is not None:
+                    dropped.append(self.current)
+            elif len(self._jobs) >= self.maxsize:
+                dropped = [job] if self.policy == "drop_newest" else [self._jobs.popleft()]
+            accepted = job not in dropped
+            if accepted:
+                self._jobs.append(job)
+                self._cond.notify()
+            depth = len(self._jobs)
+            self.dropped += len(dropped)
+        for old in dropped:
+            old.cancel()
+            self.log(f"Dropped utterance #{old.id} ({self.policy}).")
+        if accepted:
+            self.log(f"Queued utterance #{job.id} (queue depth {depth}).")
+        return accepted
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            pending = list(self._jobs)
+            self._jobs.clear()
+            self._cond.notify_all()
+        for job in pending:
+            job.cancel()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = self.current = self._jobs.popleft()
+                depth = len(self._jobs)
+            self.last_wait_ms = (time.perf_counter() - job.created) * 1000
+            self.log(f"Processing utterance #{job.id} (waited {self.last_wait_ms:.0f} ms, {depth} queued).")
+            try:
+                self.handler(job)
+            except Exception as e:
+                self.log(f"Error in utterance #{job.id}: {e}")
+            finally:
+                with self._cond:
+                    self.current = None
+                    self.processed += 1
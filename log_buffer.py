@@ -0,0 +1,27 @@
+import threading
+from collections import deque
+
+# Bounded hand-off between the threads that log and the GUI that displays the log.
+# append() is cheap and never blocks on the GUI; the window drains the buffer in batches
+# on a timer. When producers outrun the display, the oldest lines are dropped and counted.
+class LogBuffer:
+    def __init__(self, capacity=5000):
+        self._lines = deque(maxlen=max(1, int(capacity)))
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def append(self, message):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(message)
+
+    def drain(self):
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self.dropped = self.dropped, 0
+        return lines, dropped
+
+    def __len__(self):
+        return len(self._lines)
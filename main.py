@@ -1,4 +1,5 @@
 import sys
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from ui_main import MainWindow
 
@@ -6,4 +7,5 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    QTimer.singleShot(0, window.start_voice_thread)
     sys.exit(app.exec_())
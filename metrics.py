@@ -0,0 +1,43 @@
+import json
+import os
+import threading
+import time
+
+def utterance_record(job, samplerate):
+    return {
+        "utterance_id": job.id,
+        "timestamp": time.time(),
+        "status": job.status,
+        "audio_seconds": len(job.audio) / samplerate if job.audio is not None else 0.0,
+        "spans_ms": {k: round(v, 3) for k, v in job.timings.items()},
+        "transcription": job.transcription,
+        "command": (job.command or {}).get("title"),
+        "speaker": job.speaker,
+    }
+
+# Appends one JSON object per line and rotates like logging.RotatingFileHandler:
+# metrics.jsonl -> metrics.jsonl.1 -> ... -> metrics.jsonl.<backups>, oldest dropped.
+class MetricsWriter:
+    def __init__(self, path="metrics.jsonl", max_bytes=5_000_000, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
@@ -0,0 +1,217 @@
+import threading
+import numpy as np
+
+from audio_utils import MODEL_SAMPLE_RATE
+
+# torch, whisper and speechbrain are imported on first load so that importing this module
+# (and everything that depends on it) stays cheap for stub runs and UI startup.
+
+LABELS = {"whisper": "Whisper", "verifier": "Speaker verification"}
+
+_cond = threading.Condition()
+_models = {}
+_loading = set()
+# One decode at a time per model: Whisper's kv-cache hooks live on the shared instance and
+# interleaved decodes (streaming partials, speculative jobs, the UI) corrupt each other.
+_inference_locks = {name: threading.Lock() for name in LABELS}
+
+# Set once at startup (and in the inference worker child) before the first load.
+settings = {"device": "auto", "cpu_threads": 0, "asr_backend": "whisper", "whisper_model": "small"}
+
+def configure(**options):
+    settings.update({k: v for k, v in options.items() if v is not None})
+
+def select_device(preference=None):
+    preference = preference or settings["device"]
+    if preference != "auto":
+        return preference
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def _apply_cpu_threads():
+    if settings["cpu_threads"]:
+        import torch
+        torch.set_num_threads(int(settings["cpu_threads"]))
+
+# ASR backends all expose transcribe(audio, initial_prompt=None, **options) -> {"text": ...},
+# the same shape as openai-whisper's, so callers do not care which engine is loaded.
+class WhisperBackend:
+    def __init__(self, model_size, device, quantize=False):
+        import whisper
+        self.device = device
+        self.model = whisper.load_model(model_size, device=device)
+        if quantize:
+            self.model = _quantize_linears(self.model)
+
+    def transcribe(self, audio, initial_prompt=None, **options):
+        options.setdefault("fp16", self.device == "cuda")
+        return self.model.transcribe(audio, initial_prompt=initial_prompt, **options)
+
+def _plain_linears(module):
+    # whisper builds its projections from whisper.model.Linear, an nn.Linear subclass that
+    # quantize_dynamic does not match by type; swap in plain nn.Linear sharing the weights.
+    import torch
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _plain_linears(child)
+
+def _quantize_linears(model):
+    # Dynamic int8 quantization of the Linear layers; CPU only.
+    import torch
+    from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+    _plain_linears(model)
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    count = sum(isinstance(m, DynamicQuantizedLinear) for m in model.modules())
+    if count == 0:
+        raise RuntimeError("int8 quantization did not convert any Linear layer.")
+    return model
+
+# Decoding for short command utterances: greedy, one temperature (no fallback retries),
+# no timestamps and a hard cap on generated tokens.
+def command_decode_options(max_tokens=24):
+    return {
+        "temperature": 0.0,
+        "beam_size": None,
+        "best_of": None,
+        "sample_len": int(max_tokens),
+        "without_timestamps": True,
+        "condition_on_previous_text": False,
+    }
+
+class FasterWhisperBackend:
+    def __init__(self, model_size, device):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("asr_backend 'faster-whisper' requires the faster-whisper package.")
+        self.model = WhisperModel(
+            model_size, device=device,
+            compute_type="int8" if device == "cpu" else "float16",
+            cpu_threads=int(settings["cpu_threads"] or 0)
+        )
+
+    def transcribe(self, audio, initial_prompt=None, **options):
+        kwargs = {"initial_prompt": initial_prompt}
+        if "temperature" in options:
+            kwargs["temperature"] = options["temperature"]
+        if "beam_size" in options:
+            kwargs["beam_size"] = options["beam_size"] or 1
+        if "sample_len" in options:
+            kwargs["max_new_tokens"] = options["sample_len"]
+        for key in ("without_timestamps", "condition_on_previous_text"):
+            if key in options:
+                kwargs[key] = options[key]
+        segments, _ = self.model.transcribe(audio, **kwargs)
+        return {"text": "".join(seg.text for seg in segments)}
+
+ASR_BACKENDS = ("whisper", "whisper-int8", "faster-whisper")
+
+def create_asr(backend=None, model_size=None, device=None):
+    backend = backend or settings["asr_backend"]
+    model_size = model_size or settings["whisper_model"]
+    device = select_device(device)
+    _apply_cpu_threads()
+    if backend == "whisper":
+        return WhisperBackend(model_size, device)
+    if backend == "whisper-int8":
+        return WhisperBackend(model_size, "cpu", quantize=True)
+    if backend == "faster-whisper":
+        return FasterWhisperBackend(model_size, device)
+    raise ValueError(f"Unknown ASR backend '{backend}'.")
+
+def _load_whisper():
+    return create_asr()
+
+def _load_verifier():
+    from speechbrain.inference.speaker import SpeakerRecognition
+    _apply_cpu_threads()
+    return SpeakerRecognition.from_hparams(
+        source="speechbrain/spkrec-ecapa-voxceleb",
+        savedir="pretrained_models/spkrec-ecapa-voxceleb",
+        run_opts={"device": select_device()}
+    )
+
+def _warm_whisper(model):
+    model.transcribe(np.zeros(MODEL_SAMPLE_RATE, dtype=np.float32))
+
+def _warm_verifier(model):
+    import torch
+    with torch.no_grad():
+        model.encode_batch(torch.zeros(1, MODEL_SAMPLE_RATE))
+
+_LOADERS = {"whisper": (_load_whisper, _warm_whisper), "verifier": (_load_verifier, _warm_verifier)}
+
+def is_ready(name):
+    with _cond:
+        return name in _models
+
+def get(name, log=print):
+    label = LABELS.get(name, name)
+    with _cond:
+        if name in _loading:
+            log(f"Waiting for {label} model to finish loading...")
+        # Callers arriving during a load wait for it instead of starting their own.
+        while name in _loading:
+            _cond.wait()
+        if name in _models:
+            return _models[name]
+        _loading.add(name)
+    model = None
+    try:
+        load, warm = _LOADERS[name]
+        log(f"Loading {label} model...")
+        model = load()
+        log(f"Warming up {label} model...")
+        try:
+            warm(model)
+        except Exception as e:
+            log(f"{label} warm-up failed: {e}")
+        log(f"{label} model ready.")
+    finally:
+        with _cond:
+            if model is not None:
+                _models[name] = model
+            _loading.discard(name)
+            _cond.notify_all()
+    return model
+
+def warm_up(names, log=print):
+    for name in names:
+        try:
+            get(name, log)
+        except Exception as e:
+            log(f"Error loading {LABELS.get(name, name)} model: {e}")
+
+def transcribe(audio, log=print, **options):
+    model = get("whisper", log)
+    with _inference_locks["whisper"]:
+        return model.transcribe(audio, **options)
+
+def embed(audio, log=print):
+    import torch
+    model = get("verifier", log)
+    with _inference_locks["verifier"], torch.no_grad():
+        emb = model.encode_batch(torch.as_tensor(audio).unsqueeze(0))
+    return emb.squeeze().cpu().numpy().astype(np.float32)
+
+def embed_batch(audios, log=print):
+    # One encode_batch over zero-padded clips; wav_lens (relative lengths) keeps the padding
+    # out of each clip's statistics pooling.
+    import torch
+    model = get("verifier", log)
+    longest = max(len(a) for a in audios)
+    wavs = torch.zeros(len(audios), longest)
+    for i, audio in enumerate(audios):
+        wavs[i, :len(audio)] = torch.as_tensor(audio)
+    wav_lens = torch.tensor([len(a) / longest for a in audios])
+    with _inference_locks["verifier"], torch.no_grad():
+        emb = model.encode_batch(wavs, wav_lens)
+    return emb.reshape(len(audios), -1).cpu().numpy().astype(np.float32)
+
+def embed_file(path, log=print):
+    return embed(get("verifier", log).load_audio(path), log)
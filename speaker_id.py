@@ -0,0 +1,29 @@
+import numpy as np
+
+# All enrollment embeddings stacked into one L2-normalised matrix, so scoring an utterance
+# against every enrolled speaker is a single matrix-vector product.
+class SpeakerIndex:
+    def __init__(self, embeddings):
+        self.names = list(embeddings)
+        if self.names:
+            matrix = np.stack([np.asarray(embeddings[n], dtype=np.float32).reshape(-1) for n in self.names])
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        self.matrix = _normalize(matrix)
+
+    def __len__(self):
+        return len(self.names)
+
+    def scores(self, embedding):
+        return self.matrix @ _normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+
+    def identify(self, embedding):
+        if not self.names:
+            return None, 0.0
+        scores = self.scores(embedding)
+        best = int(np.argmax(scores))
+        return self.names[best], float(scores[best])
+
+def _normalize(x):
+    norm = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norm, 1e-8)
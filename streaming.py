@@ -0,0 +1,83 @@
+import queue
+import threading
+import numpy as np
+
+import audio_utils
+
+# Decodes fixed-size windows while the key is held so only the tail is left at release.
+# Committed text is passed back to transcribe() as the prompt to keep context across windows.
+class StreamingTranscriber:
+    def __init__(self, transcribe, samplerate, window_seconds=4.0, partial_interval=1.0, on_partial=None):
+        self.transcribe = transcribe
+        self.samplerate = samplerate
+        self.window = int(window_seconds * samplerate)
+        self.partial_step = int(partial_interval * samplerate)
+        self.min_tail = int(0.1 * samplerate)
+        self.on_partial = on_partial
+        self.committed = []
+        self.error = None
+        self._tail = []
+        self._tail_len = 0
+        self._last_partial_len = 0
+        self._cancelled = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk):
+        # Called from the audio callback: just hand the (already copied) chunk over.
+        self._queue.put(chunk)
+
+    def cancel(self):
+        self._cancelled = True
+        self._queue.put(None)
+
+    def finish(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        texts = list(self.committed)
+        if self._tail_len >= self.min_tail:
+            texts.append(self._decode(self._take(self._tail_len)))
+        return " ".join(t for t in texts if t)
+
+    @property
+    def text(self):
+        return " ".join(t for t in self.committed if t)
+
+    def _run(self):
+        try:
+            while True:
+                chunk = self._queue.get()
+                if chunk is None or self._cancelled:
+                    break
+                self._tail.append(chunk)
+                self._tail_len += len(chunk)
+                if not self._queue.empty():
+                    continue
+                while self._tail_len >= self.window and not self._cancelled:
+                    self.committed.append(self._decode(self._take(self.window)))
+                    self._last_partial_len = 0
+                    self._emit(self.text)
+                if self._tail_len - self._last_partial_len >= self.partial_step and not self._cancelled:
+                    audio = np.concatenate(self._tail, axis=0)
+                    self._last_partial_len = self._tail_len
+                    self._emit((self.text + " " + self._decode(audio)).strip())
+        except Exception as e:
+            self.error = e
+
+    def _take(self, n):
+        audio = np.concatenate(self._tail, axis=0)
+        head, rest = audio[:n], audio[n:]
+        self._tail = [rest] if len(rest) else []
+        self._tail_len = len(rest)
+        return head
+
+    def _decode(self, raw):
+        audio = audio_utils.resample(raw, self.samplerate)
+        return self.transcribe(audio, prompt=self.text or None).strip()
+
+    def _emit(self, text):
+        if self.on_partial and text:
+            self.on_partial(text)
@@ -1,19 +1,21 @@
+from PyQt5.QtCore import QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
-    QPushButton, QTextEdit, QTableWidget, QTableWidgetItem,
+    QPushButton, QPlainTextEdit, QLineEdit, QLabel, QProgressBar,
     QFileDialog, QMessageBox, QDialog, QInputDialog
 )
 
 import config_manager
 from dialogs import AddEditCommandDialog, SettingsDialog, ShowCommandsDialog
+from command_table import CommandTableModel, make_command_view
 from voice_assistant import VoiceAssistantThread
 import subprocess
 import os
-import sounddevice as sd
-import wave
-import numpy as np
+from collections import deque
 
 class MainWindow(QMainWindow):
+    config_changed_signal = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Voice Assistant App")
@@ -23,8 +25,13 @@ class MainWindow(QMainWindow):
 
         # Start voice thread
         self.voice_thread = VoiceAssistantThread()
-        self.voice_thread.log_signal.connect(self.append_log)
-        self.voice_thread.start()
+        self.log_buffer = self.voice_thread.log_buffer
+        self.voice_thread.partial_transcript_signal.connect(self.show_partial_transcript)
+        self.voice_thread.metrics_signal.connect(self.update_stats)
+        self.voice_thread.ready_signal.connect(self.on_voice_ready)
+        self.voice_thread.recording_progress_signal.connect(self.show_recording_progress)
+        self.voice_thread.recording_finished_signal.connect(self.on_recording_finished)
+        self.recent_totals = deque(maxlen=50)
 
         main_widget = QWidget()
         main_layout = QHBoxLayout()
@@ -60,18 +67,47 @@ class MainWindow(QMainWindow):
         ]:
             left_layout.addWidget(w)
 
-        self.log_console = QTextEdit()
+        self.record_progress = QProgressBar()
+        self.record_progress.setRange(0, 100)
+        self.record_progress.hide()
+        left_layout.addWidget(self.record_progress)
+        self.cancel_record_button = QPushButton("Cancel Recording")
+        self.cancel_record_button.clicked.connect(self.voice_thread.cancel_recording)
+        self.cancel_record_button.hide()
+        left_layout.addWidget(self.cancel_record_button)
+
+        self.partial_label = QLabel("")
+        self.partial_label.setWordWrap(True)
+        left_layout.addWidget(self.partial_label)
+
+        self.stats_label = QLabel("No utterances yet.")
+        self.stats_label.setWordWrap(True)
+        left_layout.addWidget(self.stats_label)
+
+        # Plain text with a block cap: old lines fall off the top, so memory stays flat.
+        self.log_console = QPlainTextEdit()
         self.log_console.setReadOnly(True)
+        self.log_console.setUndoRedoEnabled(False)
+        self.log_console.setMaximumBlockCount(self.config.get("log_max_lines", 5000))
         left_layout.addWidget(self.log_console)
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start(self.config.get("log_flush_ms", 200))
         left.setLayout(left_layout)
 
         right = QWidget()
         right_layout = QVBoxLayout()
-        self.cmd_table = QTableWidget(0,4)
-        self.cmd_table.setHorizontalHeaderLabels(["Title","Keyword","Type","Data"])
-        self.cmd_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.refresh_cmd_table()
+        self.cmd_filter = QLineEdit()
+        self.cmd_filter.setPlaceholderText("Filter commands...")
+        self.cmd_filter.setClearButtonEnabled(True)
+        right_layout.addWidget(self.cmd_filter)
+        self.cmd_model = CommandTableModel(self.config.get("commands", []), parent=self)
+        self.cmd_filter.textChanged.connect(self.cmd_model.set_filter)
+        self.cmd_table = make_command_view(self.cmd_model)
         right_layout.addWidget(self.cmd_table)
+        # Listeners may fire on any thread; the signal hops back to the GUI thread.
+        self.config_changed_signal.connect(self.on_config_changed)
+        config_manager.subscribe(self._config_listener)
         right.setLayout(right_layout)
 
         main_layout.addWidget(left,1)
@@ -79,18 +115,56 @@ class MainWindow(QMainWindow):
         main_widget.setLayout(main_layout)
         self.setCentralWidget(main_widget)
 
+    # Started by main.py once the window is on screen, so the first paint never waits on it.
+    def start_voice_thread(self):
+        if not self.voice_thread.isRunning():
+            self.voice_thread.start()
+
+    def on_voice_ready(self):
+        self.append_log("Models ready.")
+
     def append_log(self, msg):
-        self.log_console.append(msg)
+        self.log_buffer.append(msg)
+
+    def flush_log(self):
+        lines, dropped = self.log_buffer.drain()
+        if dropped:
+            lines.insert(0, f"... {dropped} log lines dropped ...")
+        if lines:
+            text = "\n".join(lines)
+            self.log_console.appendPlainText(text)
+            print(text)
+
+    def update_stats(self, record):
+        spans = record.get("spans_ms", {})
+        if "total" in spans:
+            self.recent_totals.append(spans["total"])
+        lines = [f"Utterance #{record['utterance_id']}: {record['status']}"]
+        lines.append(", ".join(f"{k} {v:.0f} ms" for k, v in spans.items()))
+        if self.recent_totals:
+            totals = sorted(self.recent_totals)
+            p50 = totals[len(totals) // 2]
+            p95 = totals[min(len(totals) - 1, int(len(totals) * 0.95))]
+            lines.append(f"Total over last {len(totals)}: p50 {p50:.0f} ms, p95 {p95:.0f} ms")
+        self.stats_label.setText("\n".join(lines))
+
+    def show_partial_transcript(self, text):
+        self.partial_label.setText(text)
+
+    def _config_listener(self, config, changed):
+        self.config_changed_signal.emit(changed)
+
+    def on_config_changed(self, changed):
+        if "commands" in changed:
+            self.refresh_cmd_table()
 
     def refresh_cmd_table(self):
-        cfg = config_manager.load_config()
-        cmds = cfg.get("commands",[])
-        self.cmd_table.setRowCount(len(cmds))
-        for i,cmd in enumerate(cmds):
-            self.cmd_table.setItem(i,0,QTableWidgetItem(cmd.get("title","")))
-            self.cmd_table.setItem(i,1,QTableWidgetItem(cmd.get("keyword","")))
-            self.cmd_table.setItem(i,2,QTableWidgetItem(cmd.get("type","")))
-            self.cmd_table.setItem(i,3,QTableWidgetItem(cmd.get("data","")))
+        self.cmd_model.set_commands(config_manager.load_config().get("commands",[]))
+
+    # Index into config["commands"] of the selected row, which differs from the row while filtered.
+    def selected_command_index(self):
+        index = self.cmd_table.currentIndex()
+        return self.cmd_model.command_index(index.row()) if index.isValid() else -1
 
     def add_command(self):
         dlg = AddEditCommandDialog(self)
@@ -105,12 +179,11 @@ class MainWindow(QMainWindow):
             try:
                 config_manager.add_command_entry(entry)
                 self.append_log(f"Added command: {title}")
-                self.refresh_cmd_table()
             except ValueError as e:
                 QMessageBox.warning(self,"Error",str(e))
 
     def edit_command(self):
-        row = self.cmd_table.currentRow()
+        row = self.selected_command_index()
         if row<0:
             QMessageBox.warning(self,"Error","No command selected.")
             return
@@ -131,12 +204,11 @@ class MainWindow(QMainWindow):
             try:
                 config_manager.update_command_entry(row,{"title":title,"keyword":kw,"type":tp,"data":data})
                 self.append_log(f"Updated command: {title}")
-                self.refresh_cmd_table()
             except ValueError as e:
                 QMessageBox.warning(self,"Error",str(e))
 
     def delete_command(self):
-        row = self.cmd_table.currentRow()
+        row = self.selected_command_index()
         if row<0:
             QMessageBox.warning(self,"Error","No command selected.")
             return
@@ -144,7 +216,6 @@ class MainWindow(QMainWindow):
             try:
                 config_manager.delete_command_entry(row)
                 self.append_log("Deleted command.")
-                self.refresh_cmd_table()
             except Exception as e:
                 QMessageBox.warning(self,"Error",str(e))
 
@@ -158,7 +229,17 @@ class MainWindow(QMainWindow):
         ShowCommandsDialog(self).exec_()
 
     def play_last_recording(self):
-        if os.path.exists("last_recording.wav"):
+        history = self.voice_thread.history
+        entry = history.latest() if history else None
+        if entry is not None:
+            try:
+                import sounddevice as sd
+                audio, rate = history.load(entry)
+                sd.play(audio, rate)
+                self.append_log(f"Playing recording #{entry['id']}: '{entry.get('transcript') or ''}'")
+            except Exception as e:
+                QMessageBox.warning(self,"Error","Cannot play: "+str(e))
+        elif os.path.exists("last_recording.wav"):
             try:
                 if os.name=='nt': os.startfile("last_recording.wav")
                 else: subprocess.Popen(["xdg-open","last_recording.wav"])
@@ -172,23 +253,10 @@ class MainWindow(QMainWindow):
         name, ok = QInputDialog.getText(self,"Speaker Enrollment","Enter speaker name:")
         if not ok or not name.strip(): return
         name=name.strip()
-        duration=20
-        self.append_log(f"Recording enrollment '{name}' ({duration}s)...")
-        try:
-            audio = sd.rec(int(44100*duration),samplerate=44100,channels=1)
-            sd.wait()
-            path=f"enroll_{name}.wav"
-            with wave.open(path,"wb") as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(44100)
-                wf.writeframes((audio*32767).astype(np.int16).tobytes())
-            config_manager.add_enrollment(name,path)
-            config_manager.set_active_enrollment(name)
-            self.voice_thread.update_speaker_settings(True,path)
-            self.append_log(f"Enrollment saved: {path}")
-        except Exception as e:
-            self.append_log("Enrollment error: "+str(e))
+        if name in config_manager.load_config().get("enrollments",{}):
+            QMessageBox.warning(self,"Error",f"Enrollment '{name}' already exists.")
+            return
+        self.start_recording(f"enroll_{name}.wav",20,name)
 
     def open_settings(self):
         cfg = config_manager.load_config()
@@ -201,25 +269,49 @@ class MainWindow(QMainWindow):
         )
         if dlg.exec_() == QDialog.Accepted:
             s=dlg.get_settings()
+            try:
+                with config_manager.transaction() as new_cfg:
+                    if s["trigger_key"]:
+                        config_manager.set_trigger_key(s["trigger_key"])
+                    config_manager.set_speaker_recognition_enabled(s["speaker_enabled"])
+                    if s["active_enrollment"]:
+                        config_manager.set_active_enrollment(s["active_enrollment"])
+            except ValueError as e:
+                QMessageBox.warning(self,"Error",str(e))
+                return
             if s["trigger_key"]:
-                config_manager.set_trigger_key(s["trigger_key"])
                 self.voice_thread.update_trigger_key(s["trigger_key"])
-            config_manager.set_speaker_recognition_enabled(s["speaker_enabled"])
-            config_manager.set_active_enrollment(s["active_enrollment"])
-            path = config_manager.load_config().get("enrollments",{}).get(s["active_enrollment"],"")
-            self.voice_thread.update_speaker_settings(s["speaker_enabled"],path)
+            path = new_cfg.get("enrollments",{}).get(s["active_enrollment"],"")
+            self.voice_thread.update_speaker_settings(s["speaker_enabled"],path,s["active_enrollment"])
             self.append_log("Settings updated.")
 
     def manual_record(self):
-        self.append_log("Manual record (5s)...")
+        self.start_recording("manual_recording.wav",5)
+
+    def start_recording(self, path, seconds, enroll_name=None):
         try:
-            audio = sd.rec(int(44100*5),samplerate=44100,channels=1)
-            sd.wait()
-            with wave.open("manual_recording.wav","wb") as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(44100)
-                wf.writeframes((audio*32767).astype(np.int16).tobytes())
-            self.append_log("Saved manual_recording.wav")
-        except Exception as e:
-            self.append_log("Manual record error: "+str(e))
+            self.voice_thread.start_recording(path,seconds,enroll_name)
+        except (RuntimeError, ValueError) as e:
+            QMessageBox.warning(self,"Error",str(e))
+            return
+        self.enroll_button.setEnabled(False)
+        self.manual_record_button.setEnabled(False)
+        self.record_progress.setValue(0)
+        self.record_progress.setFormat(f"Recording {path}")
+        self.record_progress.show()
+        self.cancel_record_button.show()
+
+    def show_recording_progress(self, fraction, level_db):
+        self.record_progress.setValue(int(fraction*100))
+        if fraction >= 1:
+            self.record_progress.setFormat("Saving recording...")
+        else:
+            self.record_progress.setFormat(f"%p%  level {level_db:.0f} dBFS")
+
+    def on_recording_finished(self, path, error):
+        self.record_progress.hide()
+        self.cancel_record_button.hide()
+        self.enroll_button.setEnabled(True)
+        self.manual_record_button.setEnabled(True)
+        if error and error != "cancelled":
+            QMessageBox.warning(self,"Recording Error",error)
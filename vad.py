@@ -0,0 +1,175 @@
+from collections import deque
+
+import numpy as np
+
+FRAME_MS = 25
+HOP_MS = 10
+
+def frame_features(audio, samplerate, frame_ms=FRAME_MS, hop_ms=HOP_MS):
+    # Per-frame energy (dBFS) and zero-crossing rate from running sums, no per-frame loop.
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    frame = int(samplerate * frame_ms / 1000)
+    hop = int(samplerate * hop_ms / 1000)
+    if len(audio) < frame:
+        return np.zeros(0), np.zeros(0), hop, frame
+    starts = np.arange(0, len(audio) - frame + 1, hop)
+    energy = np.concatenate(([0.0], np.cumsum(audio.astype(np.float64) ** 2)))
+    power = (energy[starts + frame] - energy[starts]) / frame
+    crossings = np.concatenate(([0], np.cumsum(np.signbit(audio[1:]) != np.signbit(audio[:-1]))))
+    zcr = (crossings[starts + frame - 1] - crossings[starts]) / (frame - 1)
+    return 10 * np.log10(power + 1e-10), zcr, hop, frame
+
+def speech_threshold(energy_db, floor_db=-50.0, margin_db=10.0, speech_db=-30.0, min_spread_db=3.0):
+    # Adaptive: a margin above the noise floor (10th percentile frame), never below an
+    # absolute floor so pure silence and steady background noise stay silent. A clip that is
+    # speech from end to end has no quiet frames to take the floor from: when its quietest
+    # frames are near speech level and even its quieter half moves like speech (a noise bed
+    # under an utterance is flat), the absolute speech level is used instead. A steady hum
+    # at any level still counts as silence.
+    low, median = np.percentile(energy_db, [10, 50])
+    threshold = max(low + margin_db, floor_db)
+    if low >= speech_db - margin_db and median - low >= min_spread_db:
+        threshold = min(threshold, speech_db)
+    return threshold
+
+def speech_mask(energy_db, zcr, threshold, floor_db=-50.0, fricative_db=None):
+    # Voiced frames by energy; quieter frames with a high crossing rate are fricatives.
+    # fricative_db is the level those are measured against, by default the voiced threshold.
+    fricative_db = threshold if fricative_db is None else fricative_db
+    return (energy_db > threshold) | ((energy_db > max(fricative_db - 6.0, floor_db)) & (zcr > 0.3))
+
+def trim_silence(audio, samplerate, pad_ms=200, min_speech_ms=150, floor_db=-50.0):
+    energy_db, zcr, hop, frame = frame_features(audio, samplerate)
+    if len(energy_db) == 0:
+        return None
+    # Fricatives stay relative to the noise floor: broadband room noise has a high crossing
+    # rate too, and would pass a lowered absolute threshold.
+    relative = max(np.percentile(energy_db, 10) + 10.0, floor_db)
+    mask = speech_mask(energy_db, zcr, speech_threshold(energy_db, floor_db), floor_db, relative)
+    if mask.sum() * hop < samplerate * min_speech_ms / 1000:
+        return None
+    idx = np.flatnonzero(mask)
+    pad = int(samplerate * pad_ms / 1000)
+    start = max(0, idx[0] * hop - pad)
+    end = min(len(audio), idx[-1] * hop + frame + pad)
+    return audio[start:end], start, end
+
+# Incremental version of the detector for always-on listening: fed whatever the ring buffer
+# gained since the last poll, it tracks the noise floor and emits (start, end) sample
+# positions of finished utterances. State is a frame's worth of carry, a few counters and
+# at most one segment's frame energies, so memory stays flat no matter how long it runs.
+# The floor is seeded from the first half second, follows quiet frames between utterances,
+# and is also raised by the minimum frame energy of the last few seconds, which keeps
+# moving during speech; a segment cut at max_segment resets it to that segment's quietest
+# frames. Noise that starts or grows mid-session therefore stops counting as speech within
+# a few seconds instead of being forwarded in back-to-back max-length segments.
+class SpeechSegmenter:
+    def __init__(self, samplerate, onset_ms=100, hangover_ms=600, min_speech_ms=250,
+                 max_segment_s=15.0, pad_ms=200, floor_db=-50.0, margin_db=10.0,
+                 seed_ms=500, min_window_s=5):
+        self.samplerate = samplerate
+        self.hop = int(samplerate * HOP_MS / 1000)
+        self.frame = int(samplerate * FRAME_MS / 1000)
+        self.onset = max(1, int(onset_ms / HOP_MS))
+        self.hangover = max(1, int(hangover_ms / HOP_MS))
+        self.min_speech = int(samplerate * min_speech_ms / 1000)
+        self.max_segment = int(samplerate * max_segment_s)
+        self.pad = int(samplerate * pad_ms / 1000)
+        self.floor_db = floor_db
+        self.margin_db = margin_db
+        self.seed_frames = max(1, int(seed_ms / HOP_MS))
+        self.block_frames = int(1000 / HOP_MS)
+        self.min_window = max(1, int(min_window_s))
+        self.frames_examined = 0
+        self.segments_forwarded = 0
+        self.segments_discarded = 0
+        self.reset()
+
+    def reset(self, position=0):
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._carry_pos = position
+        self._in_speech = False
+        self._run = 0
+        self._silence = 0
+        self._onset_pos = 0
+        self._seg_start = 0
+        self._last_speech = 0
+        self._seg_energy = []
+        self.noise_db = None
+        self._seed = []
+        self._block_min = np.inf
+        self._block_len = 0
+        self._minima = deque(maxlen=self.min_window)  # per-second minimum frame energies
+
+    def process(self, samples, position):
+        if position != self._carry_pos + len(self._carry):
+            self.reset(position)
+        buf = np.concatenate((self._carry, np.asarray(samples, dtype=np.float32).reshape(-1)))
+        base = self._carry_pos
+        energy_db, zcr, _, _ = frame_features(buf, self.samplerate)
+        n = len(energy_db)
+        self._carry = buf[n * self.hop:]
+        self._carry_pos = base + n * self.hop
+        if n == 0:
+            return []
+        self.frames_examined += n
+        if self.noise_db is None:
+            self._seed.extend(energy_db[:self.seed_frames - len(self._seed)].tolist())
+            if len(self._seed) < self.seed_frames:
+                return []
+            self.noise_db = float(np.percentile(self._seed, 20))
+            self._seed = []
+        threshold = max(self.noise_db + self.margin_db, self.floor_db)
+        mask = speech_mask(energy_db, zcr, threshold, self.floor_db)
+        segments = []
+        for i in range(n):
+            pos = base + i * self.hop
+            e = energy_db[i]
+            self._track_minimum(e)
+            if not self._in_speech:
+                # Noise floor follows quiet frames quickly and loud ones slowly.
+                self.noise_db += (e - self.noise_db) * (0.3 if e < self.noise_db else 0.005)
+                if mask[i]:
+                    if self._run == 0:
+                        self._onset_pos = pos
+                    self._run += 1
+                    if self._run >= self.onset:
+                        self._in_speech = True
+                        self._seg_start = max(0, self._onset_pos - self.pad)
+                        self._last_speech = pos + self.frame
+                        self._silence = 0
+                        self._seg_energy = [e]
+                else:
+                    self._run = 0
+                continue
+            self._seg_energy.append(e)
+            if mask[i]:
+                self._silence = 0
+                self._last_speech = pos + self.frame
+            else:
+                self._silence += 1
+            forced = pos + self.frame - self._seg_start >= self.max_segment
+            if self._silence >= self.hangover or forced:
+                if forced:
+                    self.noise_db = float(np.percentile(self._seg_energy, 10))
+                self._seg_energy = []
+                end = min(self._last_speech + self.pad, pos + self.frame)
+                if self._last_speech - self._onset_pos >= self.min_speech:
+                    segments.append((self._seg_start, end))
+                    self.segments_forwarded += 1
+                else:
+                    self.segments_discarded += 1
+                self._in_speech = False
+                self._run = 0
+        return segments
+
+    def _track_minimum(self, e):
+        self._block_min = min(self._block_min, e)
+        self._block_len += 1
+        if self._block_len < self.block_frames:
+            return
+        self._minima.append(self._block_min)
+        self._block_min = np.inf
+        self._block_len = 0
+        if len(self._minima) == self.min_window:
+            self.noise_db = max(self.noise_db, min(self._minima))
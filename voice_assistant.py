@@ -1,7 +1,5 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-import sounddevice as sd
 import numpy as np
-import wave
 import subprocess
 import os
 import keyboard
@@ -10,8 +8,19 @@ import time
 import config_manager
 import ctypes.util
 import urllib.parse
-import whisper
-from speechbrain.inference.speaker import SpeakerRecognition
+from concurrent.futures import ThreadPoolExecutor
+import audio_utils
+import model_registry
+import vad
+import metrics
+from streaming import StreamingTranscriber
+from capture import RingBuffer, RingRecording
+from command_matcher import CommandMatcher, FuzzyIndex
+from speaker_id import SpeakerIndex
+from inference_worker import InferenceWorker
+from job_queue import Job, UtteranceScheduler
+from log_buffer import LogBuffer
+from history import open_history
 
 if os.name == "nt":
     if ctypes.util.find_library("c") is None:
@@ -22,47 +31,265 @@ if os.name == "nt":
             return original_find_library(name)
         ctypes.util.find_library = patched_find_library
 
+SPEAKER_THRESHOLD = 0.25  # SpeechBrain's default cosine threshold for ECAPA verification
+
 class VoiceAssistantThread(QThread):
-    log_signal = pyqtSignal(str)
     command_signal = pyqtSignal(str)
+    partial_transcript_signal = pyqtSignal(str)
+    metrics_signal = pyqtSignal(dict)
+    ready_signal = pyqtSignal()
+    recording_progress_signal = pyqtSignal(float, float)
+    recording_finished_signal = pyqtSignal(str, str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         cfg = config_manager.load_config()
+        self.log_buffer = LogBuffer(cfg.get("log_max_lines", 5000))
+        self._stream_status = None
+        self._stream_status_count = 0
+        self._stream_status_reported = 0
         self.trigger_key = cfg.get("trigger_key", "]")
         self.speaker_enabled = cfg.get("speaker_recognition_enabled", False)
         self.enrollments = cfg.get("enrollments", {})
         self.active_enrollment = cfg.get("active_enrollment", "")
         self.enroll_path = self.enrollments.get(self.active_enrollment, "")
+        self.speaker_mode = cfg.get("speaker_mode", "verify")
+        self.save_last_recording = cfg.get("save_last_recording", True)
+        self.samplerate = audio_utils.select_capture_rate(cfg.get("capture_samplerate", audio_utils.MODEL_SAMPLE_RATE))
+        self.streaming_enabled = cfg.get("streaming_transcription", False)
+        self.streaming_window = cfg.get("streaming_window_seconds", 4.0)
+        self.streamer = None
+        self.speculative = cfg.get("speculative_transcription", True)
+        self.command_decoding = cfg.get("command_decoding", True)
+        self.command_max_tokens = cfg.get("command_max_tokens", 24)
+        self.fuzzy_matching = cfg.get("fuzzy_matching", True)
+        self.fuzzy_threshold = cfg.get("fuzzy_threshold", 0.75)
+        self._command_prompt = None
+        self._command_prompt_version = None
+        self.vad_enabled = cfg.get("vad_enabled", True)
+        self.listening_mode = cfg.get("listening_mode", "push_to_talk")
+        self.wake_phrase = cfg.get("wake_phrase", "").lower().strip()
+        self._listen_thread = None
+        self._listen_stop = threading.Event()
+        self.metrics_writer = self.create_metrics_writer(cfg)
+        self.history = self.create_history(cfg)
+        self._speculative_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative")
+        self.inference_backend = cfg.get("inference_backend", "thread")
+        model_registry.configure(
+            device=cfg.get("device", "auto"),
+            cpu_threads=cfg.get("cpu_threads", 0),
+            asr_backend=cfg.get("asr_backend", "whisper"),
+            whisper_model=cfg.get("whisper_model", "small")
+        )
+        self.worker = None
+        self.preroll = int(cfg.get("preroll_seconds", 0.3) * self.samplerate)
+        self.ring = RingBuffer(self.preroll + cfg.get("max_recording_seconds", 60) * self.samplerate)
+        self.segmenter = vad.SpeechSegmenter(self.samplerate)
+        self.recording = None
+        self._recording_target = None
 
         self.is_recording = False
-        self.audio_buffer = []
+        self.record_start = 0
+        self.streamer_pos = 0
         self.stream = None
+        self.scheduler = UtteranceScheduler(
+            self.process_audio,
+            maxsize=cfg.get("job_queue_size", 2),
+            policy=cfg.get("job_queue_policy", "drop_oldest"),
+            log=self.log
+        )
+        self._matcher = None
+        self._matcher_version = None
+        self._fuzzy = FuzzyIndex()
+        self._fuzzy_version = None
         self._stop_event = threading.Event()
+        config_manager.subscribe(self.on_config_changed)
         self._lock = threading.Lock()
+        self._embedding_lock = threading.Lock()
+        self.enroll_embedding = None
+        self._speaker_index = None
 
-        # Models
-        self.whisper_model = None
-        self.verifier = None
-        if self.speaker_enabled and os.path.exists(self.enroll_path):
-            self.verifier = SpeakerRecognition.from_hparams(
-                source="speechbrain/spkrec-ecapa-voxceleb",
-                savedir="pretrained_models/spkrec-ecapa-voxceleb",
-                run_opts={"device":"cuda"}
-            )
+    # Overridden by offline replays, which must not touch the live metrics log or history.
+    def create_metrics_writer(self, cfg):
+        metrics_file = cfg.get("metrics_file", "metrics.jsonl")
+        if not metrics_file:
+            return None
+        return metrics.MetricsWriter(metrics_file, cfg.get("metrics_max_bytes", 5_000_000), cfg.get("metrics_backups", 3))
+
+    def create_history(self, cfg):
+        return open_history(cfg) if cfg.get("history_enabled", True) else None
 
     def run(self):
         self.log(f"Voice Assistant started. Trigger key: {self.trigger_key}")
+        if self.samplerate != audio_utils.MODEL_SAMPLE_RATE:
+            self.log(f"Capturing at {self.samplerate} Hz; resampling to {audio_utils.MODEL_SAMPLE_RATE} Hz for inference.")
+        if self.inference_backend == "process":
+            self.worker = InferenceWorker(self.model_names(), log=self.log)
+        threading.Thread(target=self.warm_up_models, daemon=True).start()
+        self.open_stream()
+        if self.listening_mode == "hands_free":
+            self.start_listening()
         keyboard.on_press_key(self.trigger_key, self.key_down_callback, suppress=False)
         keyboard.on_release_key(self.trigger_key, self.key_up_callback, suppress=False)
         while not self._stop_event.is_set():
             time.sleep(0.1)
+            self.report_stream_status()
+            self.poll_recording()
         keyboard.unhook_all()
+        self.stop_listening()
+        self.close_stream()
+        self.scheduler.stop()
+        if self.worker:
+            self.worker.stop()
         self.log("Voice Assistant stopped.")
 
     def stop(self):
         self._stop_event.set()
 
+    # The input stream stays open for the thread's lifetime; key presses only mark ring positions.
+    def open_stream(self):
+        if self.stream is not None:
+            return True
+        try:
+            import sounddevice as sd
+            self.stream = sd.InputStream(samplerate=self.samplerate, channels=1, dtype="float32", callback=self.audio_callback)
+            self.stream.start()
+            return True
+        except Exception as e:
+            self.stream = None
+            self.log("Error opening input stream: " + str(e))
+            return False
+
+    def close_stream(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    # Hands-free mode: poll the ring the push-to-talk path already fills, run the cheap
+    # segmenter over the new samples and queue only finished utterances for inference.
+    def start_listening(self):
+        if self._listen_thread is not None and self._listen_thread.is_alive():
+            return
+        if not self.open_stream():
+            return
+        self._listen_stop.clear()
+        self._listen_thread = threading.Thread(target=self.listen_loop, daemon=True)
+        self._listen_thread.start()
+        wake = f" Wake phrase: '{self.wake_phrase}'." if self.wake_phrase else ""
+        self.log("Hands-free listening started." + wake)
+
+    def stop_listening(self):
+        if self._listen_thread is None:
+            return
+        self._listen_stop.set()
+        self._listen_thread.join(timeout=1)
+        self._listen_thread = None
+        seg = self.segmenter
+        self.log(f"Hands-free listening stopped ({seg.frames_examined} frames examined, "
+                 f"{seg.segments_forwarded} segments forwarded, {seg.segments_discarded} discarded).")
+
+    def listen_loop(self):
+        pos = self.ring.position
+        self.segmenter.reset(pos)
+        while not self._listen_stop.wait(0.1):
+            end = self.ring.position
+            pos = max(pos, self.ring.oldest())
+            segments = self.segmenter.process(self.ring.read(pos, end), pos)
+            pos = end
+            if self.is_recording or self.recording is not None:
+                continue
+            for start, stop in segments:
+                seg = self.segmenter
+                self.log(f"Speech segment of {(stop - start) / self.samplerate:.2f}s "
+                         f"({seg.frames_examined} frames examined, {seg.segments_forwarded} forwarded).")
+                self.scheduler.submit(Job(self.ring.read(start, stop), wake_phrase=self.wake_phrase))
+
+    def ensure_models(self, names):
+        if self.worker:
+            return
+        for name in names:
+            model_registry.get(name, self.log)
+
+    def model_names(self):
+        if self.speaker_mode == "identify" and self.speaker_enabled and self.enrollments:
+            return ["verifier", "whisper"]
+        if self.speaker_enabled and os.path.exists(self.enroll_path):
+            return ["verifier", "whisper"]
+        return ["whisper"]
+
+    def warm_up_models(self):
+        names = self.model_names()
+        # With the process backend the child warms up its own models.
+        if not self.worker:
+            model_registry.warm_up(names, self.log)
+        if "verifier" in names and (self.worker or model_registry.is_ready("verifier")):
+            try:
+                if self.speaker_mode == "identify":
+                    self.load_speaker_index()
+                else:
+                    self.load_enrollment_embedding()
+            except Exception as e:
+                self.log("Error computing enrollment embedding: " + str(e))
+        if self.worker:
+            self.worker.ready.wait(self.worker.timeout)
+        self.ready_signal.emit()
+
+    # Enrollment and debug recordings come from the same persistent stream and ring as
+    # commands; the run loop polls them and reports progress, so no thread ever waits on
+    # sd.wait(). With enroll_name set, the finished clip becomes that speaker's enrollment
+    # and its embedding is computed and cached before recording_finished_signal fires.
+    def start_recording(self, path, seconds, enroll_name=None):
+        with self._lock:
+            if self.recording is not None:
+                raise RuntimeError("A recording is already in progress.")
+            if not self.open_stream():
+                raise RuntimeError("Input stream is not available.")
+            if seconds * self.samplerate > self.ring.capacity:
+                raise ValueError(f"Recordings are limited to {self.ring.capacity // self.samplerate}s.")
+            self._recording_target = (path, enroll_name)
+            self.recording = RingRecording(self.ring, self.samplerate, seconds)
+        self.log(f"Recording {seconds}s to {path}...")
+
+    def cancel_recording(self):
+        recording = self.recording
+        if recording is not None:
+            recording.cancel()
+
+    def poll_recording(self):
+        recording = self.recording
+        if recording is None:
+            return
+        if recording.cancelled:
+            self.recording = None
+            self.log("Recording cancelled.")
+            self.recording_finished_signal.emit("", "cancelled")
+            return
+        fraction, level = recording.poll()
+        self.recording_progress_signal.emit(fraction, level)
+        if recording.done:
+            self.recording = None
+            path, enroll_name = self._recording_target
+            threading.Thread(target=self.finish_recording, args=(recording, path, enroll_name), daemon=True).start()
+
+    def finish_recording(self, recording, path, enroll_name):
+        error = ""
+        try:
+            if recording.lost:
+                self.log(f"Recording lost {recording.lost / self.samplerate:.1f}s of audio.")
+            audio_utils.write_wav(path, recording.audio(), self.samplerate)
+            self.log(f"Saved {path}")
+            if enroll_name:
+                config_manager.add_enrollment(enroll_name, path)
+                config_manager.set_active_enrollment(enroll_name)
+                self.update_speaker_settings(True, path, enroll_name)
+                self.load_enrollment_embedding()
+                self.log(f"Enrollment embedding for '{enroll_name}' cached.")
+        except Exception as e:
+            error = str(e)
+            self.log("Recording error: " + error)
+        self.recording_finished_signal.emit(path, error)
+
     def update_trigger_key(self, new_key):
         keyboard.unhook_all()
         self.trigger_key = new_key
@@ -70,115 +297,391 @@ class VoiceAssistantThread(QThread):
         keyboard.on_release_key(self.trigger_key, self.key_up_callback, suppress=False)
         self.log("Trigger key updated to: " + self.trigger_key)
 
-    def update_speaker_settings(self, enabled, enroll_path):
+    def update_speaker_settings(self, enabled, enroll_path, enrollment_name=None):
         self.speaker_enabled = enabled
         self.enroll_path = enroll_path
-        if enabled and os.path.exists(enroll_path) and self.verifier is None:
-            self.verifier = SpeakerRecognition.from_hparams(
-                source="speechbrain/spkrec-ecapa-voxceleb",
-                savedir="pretrained_models/spkrec-ecapa-voxceleb",
-                run_opts={"device":"cuda"}
-            )
+        if enrollment_name is not None:
+            self.active_enrollment = enrollment_name
+        with self._embedding_lock:
+            self.enroll_embedding = None
+        if enabled and os.path.exists(enroll_path):
+            threading.Thread(target=self.warm_up_models, daemon=True).start()
         self.log(f"Speaker recognition {'enabled' if enabled else 'disabled'}. Enrollment: {enroll_path}")
 
     def key_down_callback(self, event):
         with self._lock:
             if not self.is_recording:
+                if not self.open_stream():
+                    return
                 self.is_recording = True
-                self.audio_buffer = []
+                self.record_start = self.ring.mark(self.preroll)
+                if self.streaming_enabled:
+                    self.streamer_pos = self.record_start
+                    self.streamer = StreamingTranscriber(
+                        self.transcribe_audio, self.samplerate,
+                        window_seconds=self.streaming_window,
+                        on_partial=self.partial_transcript_signal.emit
+                    )
                 self.log("Recording started.")
-                self.stream = sd.InputStream(samplerate=44100, channels=1, callback=self.audio_callback)
-                self.stream.start()
 
     def key_up_callback(self, event):
         with self._lock:
             if self.is_recording:
                 self.is_recording = False
-                if self.stream:
-                    self.stream.stop()
-                    self.stream.close()
-                    self.stream = None
+                start, end = self.record_start, self.ring.position
+                streamer, self.streamer = self.streamer, None
+                # The job owns a copy of its audio, so later recordings cannot disturb it.
+                t0 = time.perf_counter()
+                audio_data = self.ring.read(start, end)
+                job = Job(audio_data, streamer)
+                job.timings["capture"] = (end - start) / self.samplerate * 1000
+                job.timings["buffer"] = (time.perf_counter() - t0) * 1000
+                if len(audio_data) < end - start:
+                    self.log(f"Recording exceeded buffer; kept last {len(audio_data) / self.samplerate:.1f}s.")
                 self.log("Recording stopped.")
-                threading.Thread(target=self.process_audio).start()
+                self.scheduler.submit(job)
 
     def audio_callback(self, indata, frames, time_info, status):
+        # Nothing is logged from the PortAudio thread; the run loop reports status flags.
         if status:
-            self.log("Error: " + str(status))
-        self.audio_buffer.append(indata.copy())
+            self._stream_status = status
+            self._stream_status_count += 1
+        self.ring.write(indata[:, 0])
+        streamer = self.streamer
+        if streamer is not None:
+            streamer.feed(self.ring.read(self.streamer_pos))
+            self.streamer_pos = self.ring.position
 
-    def process_audio(self):
+    def report_stream_status(self):
+        count = self._stream_status_count
+        if count != self._stream_status_reported:
+            self.log(f"Audio stream status: {self._stream_status} ({count - self._stream_status_reported} callbacks)")
+            self._stream_status_reported = count
+
+    def process_audio(self, job):
+        try:
+            self._process_audio(job)
+        finally:
+            record = metrics.utterance_record(job, job.samplerate or self.samplerate)
+            self.metrics_signal.emit(record)
+            if self.metrics_writer:
+                try:
+                    self.metrics_writer.write(record)
+                except OSError as e:
+                    self.log("Error writing metrics: " + str(e))
+            if self.history and job.audio is not None and len(job.audio):
+                try:
+                    self.history.append(
+                        job.audio, job.samplerate or self.samplerate, status=job.status,
+                        transcript=job.transcription, command=record["command"],
+                        speaker=job.speaker, speaker_score=job.speaker_score
+                    )
+                except OSError as e:
+                    self.log("Error writing recording history: " + str(e))
+
+    def _process_audio(self, job):
+        streamer = job.streamer
+        audio_data = job.audio
+        samplerate = job.samplerate or self.samplerate
+        timings = job.timings
+        pending = None
+        abandoned = threading.Event()
+        writer = None
+        wav_write = {}
         try:
-            audio_data = np.concatenate(self.audio_buffer, axis=0)
-            file_path = "last_recording.wav"
-            with wave.open(file_path, "wb") as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(44100)
-                wf.writeframes((audio_data * 32767).astype(np.int16).tobytes())
-            self.log(f"Saved recording to {file_path}")
-
-            if self.speaker_enabled:
-                if self.enroll_path and os.path.exists(self.enroll_path):
-                    score, same = self.verifier.verify_files(self.enroll_path, file_path)
-                    score = float(score)
-                    if not same:
-                        self.log(f"Speaker rejected (score={score:.2f})")
-                        return
-                    self.log(f"Speaker accepted (score={score:.2f})")
+            t_start = time.perf_counter()
+            if self.save_last_recording:
+                # The writer thread only fills its own dict; timings is updated after the join
+                # below, so the metrics record never races the write.
+                t_wav = time.perf_counter()
+                def saved(path, error):
+                    wav_write["ms"] = (time.perf_counter() - t_wav) * 1000
+                    self._on_recording_saved(path, error)
+                writer = audio_utils.write_wav_async("last_recording.wav", audio_data, samplerate, saved)
+            audio = audio_utils.resample(audio_data, samplerate)
+            timings["resample"] = (time.perf_counter() - t_start) * 1000
+
+            if self.vad_enabled:
+                t0 = time.perf_counter()
+                trimmed = vad.trim_silence(audio, audio_utils.MODEL_SAMPLE_RATE)
+                timings["vad"] = (time.perf_counter() - t0) * 1000
+                if trimmed is None:
+                    self.log(f"No speech detected; skipped inference on {len(audio) / audio_utils.MODEL_SAMPLE_RATE:.2f}s of audio.")
+                    if streamer: streamer.cancel()
+                    job.status = "no_speech"
+                    return
+                dropped = (len(audio) - len(trimmed[0])) / audio_utils.MODEL_SAMPLE_RATE
+                audio = trimmed[0]
+                if dropped > 0:
+                    self.log(f"Trimmed {dropped:.2f}s of silence.")
+
+            check_speaker = self.speaker_check_enabled()
+            if self.speaker_enabled and not check_speaker:
+                self.log("Speaker recognition enabled but no enrollment found; skipping.")
+
+            # Near zero once models are resident; non-zero means this utterance waited on a load.
+            t0 = time.perf_counter()
+            self.ensure_models(["verifier", "whisper"] if check_speaker else ["whisper"])
+            timings["model_load"] = (time.perf_counter() - t0) * 1000
+
+            # Speculatively transcribe while verifying; the transcript is discarded on rejection.
+            # A decode already running cannot be interrupted: on rejection it finishes its
+            # current pass (up to one command-mode or full decode) and skips any fallback, and
+            # the next utterance's decode waits that long on the speculative pool.
+            if check_speaker and self.speculative:
+                pending = self._speculative_pool.submit(self.transcribe_job, audio, streamer, abandoned)
+
+            if check_speaker:
+                t0 = time.perf_counter()
+                if self.speaker_mode == "identify":
+                    speaker, score, same = self.identify_speaker(audio)
                 else:
-                    self.log("Speaker recognition enabled but no enrollment found; skipping.")
+                    speaker = self.active_enrollment
+                    score, same = self.verify_speaker(audio)
+                timings["verify"] = (time.perf_counter() - t0) * 1000
+                job.speaker_score = score
+                if not same:
+                    self.log(f"Speaker rejected (score={score:.2f})")
+                    if pending:
+                        abandoned.set()
+                        pending.cancel()
+                    if streamer: streamer.cancel()
+                    job.status = "rejected"
+                    return
+                job.speaker = speaker
+                self.log(f"Speaker accepted: {speaker} (score={score:.2f})")
 
-            # Transcribe
-            transcription = self.transcribe_audio(file_path).strip(".,?\\")
+            if pending:
+                transcription, timings["transcribe"] = pending.result()
+            else:
+                transcription, timings["transcribe"] = self.transcribe_job(audio, streamer)
+            job.transcription = transcription
             self.log("Transcription: " + transcription)
-            self.process_command(transcription)
+            if job.wake_phrase:
+                idx = transcription.find(job.wake_phrase)
+                if idx < 0:
+                    self.log("Wake phrase not heard; ignoring utterance.")
+                    job.status = "ignored"
+                    return
+                transcription = transcription[idx + len(job.wake_phrase):].strip(" ,.!?")
+            if job.cancelled:
+                self.log(f"Utterance #{job.id} was superseded; not running a command.")
+                job.status = "superseded"
+                return
+            job.command = self.process_command(transcription, timings, job.speaker)
+            timings["total"] = (time.perf_counter() - t_start) * 1000
+            job.status = "matched" if job.command else "no_match"
+            self.log("Stage timings: " + ", ".join(f"{k}={v:.0f} ms" for k, v in timings.items())
+                     + (" (speculative)" if pending else ""))
 
         except Exception as e:
+            if pending:
+                abandoned.set()
+                pending.cancel()
+            if streamer: streamer.cancel()
+            job.status = "error"
             self.log("Error processing audio: " + str(e))
+        finally:
+            if writer is not None:
+                writer.join()
+                if "ms" in wav_write:
+                    timings["wav_write"] = wav_write["ms"]
+
+    def speaker_check_enabled(self):
+        if not self.speaker_enabled:
+            return False
+        if self.speaker_mode == "identify":
+            return bool(self.enrollments)
+        return bool(self.enroll_path) and os.path.exists(self.enroll_path)
+
+    def transcribe_job(self, audio, streamer=None, abandoned=None):
+        t0 = time.perf_counter()
+        transcription = None
+        if streamer:
+            try:
+                transcription = streamer.finish()
+            except Exception as e:
+                self.log("Streaming transcription failed, decoding full clip: " + str(e))
+        if transcription is None and self.command_decoding:
+            options = model_registry.command_decode_options(self.command_max_tokens)
+            transcription = self.transcribe_audio(audio, self.command_prompt(), options)
+            if abandoned is not None and abandoned.is_set():
+                return "", (time.perf_counter() - t0) * 1000
+            if self.find_command(transcription, quiet=True) is None:
+                self.log(f"Command-mode decode '{transcription.strip()}' matched nothing, decoding again.")
+                transcription = None
+        if transcription is None:
+            transcription = self.transcribe_audio(audio)
+        return transcription.strip(".,?\\"), (time.perf_counter() - t0) * 1000
+
+    def _on_recording_saved(self, path, error):
+        if error: self.log(f"Error saving {path}: {error}")
+        else: self.log(f"Saved recording to {path}")
+
+    def embed_audio(self, audio):
+        if self.worker:
+            return np.asarray(self.worker.call("embed", audio), dtype=np.float32)
+        return model_registry.embed(audio, self.log)
+
+    def embed_file(self, path):
+        if self.worker:
+            return np.asarray(self.worker.call("embed_file", path=path), dtype=np.float32)
+        return model_registry.embed_file(path, self.log)
+
+    def load_enrollment_embedding(self):
+        with self._embedding_lock:
+            if self.enroll_embedding is not None:
+                return self.enroll_embedding
+            file_hash = config_manager.file_sha256(self.enroll_path)
+            cached = config_manager.get_enrollment_embedding(self.active_enrollment, file_hash)
+            if cached is not None:
+                self.enroll_embedding = np.asarray(cached, dtype=np.float32)
+                return self.enroll_embedding
+            self.log("Computing enrollment embedding...")
+            emb = self.embed_file(self.enroll_path)
+            self.cache_enrollment_embedding(self.active_enrollment, file_hash, emb)
+            self.enroll_embedding = emb
+            return emb
 
-    def transcribe_audio(self, file_path):
-        if self.whisper_model is None:
-            self.log("Loading Whisper model...")
-            self.whisper_model = whisper.load_model("small")
-            self.log("Whisper model loaded.")
-        result = self.whisper_model.transcribe(file_path)
+    def cache_enrollment_embedding(self, name, file_hash, emb):
+        try:
+            config_manager.set_enrollment_embedding(name, file_hash, emb)
+        except ValueError as e:
+            self.log("Enrollment embedding not cached: " + str(e))
+
+    def verify_speaker(self, audio):
+        ref = self.load_enrollment_embedding()
+        emb = self.embed_audio(audio)
+        score = float(np.dot(emb, ref) / (np.linalg.norm(emb) * np.linalg.norm(ref) + 1e-8))
+        return score, score > SPEAKER_THRESHOLD
+
+    def load_speaker_index(self):
+        with self._embedding_lock:
+            if self._speaker_index is not None:
+                return self._speaker_index
+            embeddings = {}
+            for name, path in config_manager.load_config().get("enrollments", {}).items():
+                if not os.path.exists(path):
+                    continue
+                file_hash = config_manager.file_sha256(path)
+                cached = config_manager.get_enrollment_embedding(name, file_hash)
+                if cached is None:
+                    self.log(f"Computing enrollment embedding for '{name}'...")
+                    cached = self.embed_file(path)
+                    self.cache_enrollment_embedding(name, file_hash, cached)
+                embeddings[name] = cached
+            self._speaker_index = SpeakerIndex(embeddings)
+            self.log(f"Speaker index built with {len(self._speaker_index)} enrollments.")
+            return self._speaker_index
+
+    def identify_speaker(self, audio):
+        index = self.load_speaker_index()
+        name, score = index.identify(self.embed_audio(audio))
+        return name, score, name is not None and score > SPEAKER_THRESHOLD
+
+    def transcribe_audio(self, audio, prompt=None, options=None):
+        if self.worker:
+            return self.worker.call("transcribe", audio, prompt=prompt, options=options).lower()
+        result = model_registry.transcribe(audio, self.log, initial_prompt=prompt, **(options or {}))
         return result.get("text", "").lower()
 
-    def process_command(self, transcription):
-        cfg = config_manager.load_config()
-        commands = []
-        mb = cfg.get("main_browser")
-        if mb:
-            default = [
-                {"title": "Search",    "keyword": "search",    "type": "browser_search",  "data": "https://www.google.com/search?q={query}"},
-                {"title": "Wikipedia", "keyword": "wikipedia", "type": "browser_search",  "data": "https://en.wikipedia.org/wiki/{query}"},
-                {"title": "Browser",   "keyword": "browser",   "type": "browser_control", "data": "open"},
-                {"title": "New Tab",   "keyword": "new tab",   "type": "browser_control", "data": "new_tab"},
-                {"title": "Incognito", "keyword": "incognito", "type": "browser_control", "data": "incognito"}
-            ]
-            commands.extend(default)
-        commands.extend(cfg.get("commands", []))
-
-        executed = False
-        for cmd in commands:
-            kw = cmd.get("keyword","").lower()
-            if kw and kw in transcription:
-                self.log(f"Running '{cmd.get('title')}' for keyword '{kw}'")
-                if cmd["type"] == "app":
-                    self.open_app(cmd["data"])
-                elif cmd["type"] == "browser_search":
-                    q = transcription.split(kw,1)[1].strip()
-                    url = cmd["data"].format(query=urllib.parse.quote_plus(q))
-                    self.open_browser(url=url)
-                else:
-                    act = cmd["data"]
-                    if act=="open":     self.open_browser()
-                    if act=="new_tab":  self.open_browser(extra_args=["--new-tab"])
-                    if act=="incognito":self.open_browser(extra_args=["--incognito"])
-                executed = True
-                break
-        if not executed:
+    def command_prompt(self):
+        # Keywords (and the wake phrase) as a comma-separated list, rebuilt when commands change.
+        version = config_manager.commands_version()
+        if self._command_prompt is None or self._command_prompt_version != version:
+            words = [self.wake_phrase] if self.wake_phrase else []
+            for cmd in self.get_matcher().commands:
+                kw = cmd.get("keyword", "").strip()
+                if kw and kw not in words:
+                    words.append(kw)
+            self._command_prompt = ", ".join(words)
+            self._command_prompt_version = version
+        return self._command_prompt
+
+    def on_config_changed(self, config, changed):
+        self.save_last_recording = config.get("save_last_recording", True)
+        self.streaming_enabled = config.get("streaming_transcription", False)
+        self.streaming_window = config.get("streaming_window_seconds", 4.0)
+        self.speculative = config.get("speculative_transcription", True)
+        self.command_decoding = config.get("command_decoding", True)
+        self.command_max_tokens = config.get("command_max_tokens", 24)
+        self.fuzzy_matching = config.get("fuzzy_matching", True)
+        self.fuzzy_threshold = config.get("fuzzy_threshold", 0.75)
+        self.vad_enabled = config.get("vad_enabled", True)
+        self.wake_phrase = config.get("wake_phrase", "").lower().strip()
+        self.speaker_mode = config.get("speaker_mode", "verify")
+        self.enrollments = config.get("enrollments", {})
+        if "wake_phrase" in changed:
+            self._command_prompt = None
+        if changed & {"enrollments", "enrollment_embeddings"}:
+            self._speaker_index = None
+        if "listening_mode" in changed:
+            self.listening_mode = config.get("listening_mode", "push_to_talk")
+            if self.isRunning():
+                if self.listening_mode == "hands_free": self.start_listening()
+                else: self.stop_listening()
+
+    def get_matcher(self):
+        version = config_manager.commands_version()
+        if self._matcher is None or self._matcher_version != version:
+            self._matcher = CommandMatcher(config_manager.get_all_commands(config_manager.load_config()))
+            self._matcher_version = version
+        return self._matcher
+
+    def get_fuzzy_index(self):
+        version = config_manager.commands_version()
+        if self._fuzzy_version != version:
+            self._fuzzy.update(self.get_matcher().commands)
+            self._fuzzy_version = version
+        return self._fuzzy
+
+    def find_command(self, transcription, allowed=None, quiet=False):
+        # Exact keyword hits first; the fuzzy index only runs when none is found. quiet is for
+        # the command-mode decode check, so the fuzzy result is logged once, by process_command.
+        hit = self.get_matcher().match(transcription, allowed)
+        if hit is not None or not self.fuzzy_matching:
+            return hit
+        best = self.get_fuzzy_index().best(transcription, allowed)
+        if best is None:
+            return None
+        cmd, start, end, score = best
+        if score < self.fuzzy_threshold:
+            if not quiet:
+                self.log(f"Closest keyword '{cmd.get('keyword')}' for '{transcription[start:end]}' scored {score:.2f}, below {self.fuzzy_threshold:.2f}.")
+            return None
+        if not quiet:
+            self.log(f"Fuzzy-matched '{transcription[start:end]}' to keyword '{cmd.get('keyword')}' (score {score:.2f}).")
+        return cmd, start, end
+
+    def process_command(self, transcription, timings=None, speaker=None):
+        timings = {} if timings is None else timings
+        t0 = time.perf_counter()
+        # Commands with a "speakers" list are only available to those identified speakers.
+        allowed = None
+        if self.speaker_mode == "identify" and speaker is not None:
+            allowed = lambda cmd: not cmd.get("speakers") or speaker in cmd["speakers"]
+        hit = self.find_command(transcription, allowed)
+        timings["match"] = (time.perf_counter() - t0) * 1000
+        if hit is None:
             self.log("No command matched.")
+            return None
+        cmd, start, end = hit
+        kw = transcription[start:end]
+        self.log(f"Running '{cmd.get('title')}' for keyword '{kw}'")
+        t0 = time.perf_counter()
+        if cmd["type"] == "app":
+            self.open_app(cmd["data"])
+        elif cmd["type"] == "browser_search":
+            q = transcription[end:].strip()
+            url = cmd["data"].format(query=urllib.parse.quote_plus(q))
+            self.open_browser(url=url)
+        else:
+            act = cmd["data"]
+            if act=="open":     self.open_browser()
+            if act=="new_tab":  self.open_browser(extra_args=["--new-tab"])
+            if act=="incognito":self.open_browser(extra_args=["--incognito"])
+        timings["launch"] = (time.perf_counter() - t0) * 1000
+        return cmd
 
     def open_app(self, path):
         if path and os.path.exists(path):
@@ -198,6 +701,6 @@ class VoiceAssistantThread(QThread):
         try: subprocess.Popen(args); self.log("Opened browser: "+" ".join(args))
         except Exception as e: self.log("Error opening browser: "+str(e))
 
+    # Never blocks on I/O: the window's log timer drains the buffer to the console and stdout.
     def log(self, message):
-        self.log_signal.emit(message)
-        print(message)
+        self.log_buffer.append(message)